@@ -0,0 +1,81 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# a bare `import timbos_get_chromedriver` must not pull in any of these
+LAZY_MODULES = [
+    "requests",
+    "selenium",
+    "selenium_stealth",
+    "seleniumbase",
+    "seleniumwire",
+    "undetected_chromedriver",
+]
+
+DEFAULT_BUDGET_MS = 150.0
+
+
+def measure_import_ms(package="timbos_get_chromedriver") -> float:
+    # -X importtime writes "import time: self | cumulative | name" lines to stderr
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {package}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        fields = [f.strip() for f in line.split("|")]
+        if len(fields) == 3 and fields[2] == package:
+            return int(fields[1]) / 1000.0
+    raise Exception(f"No importtime line for {package}")
+
+
+def loaded_lazy_modules(package="timbos_get_chromedriver") -> list:
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys, {package}; print(' '.join(sorted(sys.modules)))",
+        ],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    loaded = set(result.stdout.split())
+    return [m for m in LAZY_MODULES if m in loaded]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Check the import time of timbos_get_chromedriver against a budget."
+    )
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    samples = [measure_import_ms() for _ in range(args.runs)]
+    median_ms = statistics.median(samples)
+    print(
+        f"import timbos_get_chromedriver: median {median_ms:.1f} ms, "
+        f"min {min(samples):.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)"
+    )
+
+    failed = False
+    if median_ms > args.budget_ms:
+        print(f"FAIL: median import time exceeds {args.budget_ms:.0f} ms")
+        failed = True
+    if eager := loaded_lazy_modules():
+        print(f"FAIL: bare import loaded {', '.join(eager)}")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,400 @@
+import argparse
+import contextlib
+import functools
+import http.server
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest.mock
+import zipfile
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+import timbos_get_chromedriver as tgc  # noqa: E402
+from bench_import import measure_import_ms  # noqa: E402
+from timbos_get_chromedriver.get_chromedriver import (  # noqa: E402
+    build_chrome_options,
+)
+from timbos_get_chromedriver.stealth import (  # noqa: E402
+    DEFAULT_STEALTH_OPTIONS,
+    apply_stealth,
+)
+from timbos_get_chromedriver.update_chromedriver import (  # noqa: E402
+    downloads,
+    resolution_cache,
+    update_chromedriver,
+)
+
+FAKE_CHROME_VERSION = "120.0.6099.109"
+FAKE_LOCAL_SAME_MAJOR_VERSION = "120.0.6099.71"
+FAKE_CHROMEDRIVER_SIZE = 8 * 1024 * 1024  # about the size of a real chromedriver
+GOOGLE_PLATFORMS = ["linux64", "mac-arm64", "mac-x64", "win32", "win64"]
+# a local chromedriver command round trip, for the stealth stand-in driver
+FAKE_CDP_ROUND_TRIP_SECONDS = 0.003
+
+BACKENDS = {
+    "sw_uc": {"use_sw_uc": True},
+    "seleniumwire": {"use_sw_uc": False},
+    "ufa_uc": {"use_ufa_uc": True},
+    "seleniumbase": {"use_sb_uc": True},
+}
+
+TEST_PAGE = "<html><head><title>bench</title></head><body><p>bench</p></body></html>"
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def _fake_manifest(base_url: str) -> dict:
+    # roughly the shape and size of the real known-good-versions manifest
+    versions = []
+    for major in range(113, 131):
+        for build in range(0, 80):
+            version = f"{major}.0.{6000 + major}.{build}"
+            if major == 120 and build == 71:
+                version = FAKE_LOCAL_SAME_MAJOR_VERSION
+            versions.append(version)
+    versions.append(FAKE_CHROME_VERSION)
+
+    return {
+        "timestamp": "2026-01-01T00:00:00.000Z",
+        "versions": [
+            {
+                "version": version,
+                "revision": "1",
+                "downloads": {
+                    "chrome": [
+                        {"platform": p, "url": f"{base_url}/unused/{p}.zip"}
+                        for p in GOOGLE_PLATFORMS
+                    ],
+                    "chromedriver": [
+                        {
+                            "platform": p,
+                            "url": f"{base_url}/chromedriver-{p}.zip",
+                        }
+                        for p in GOOGLE_PLATFORMS
+                    ],
+                },
+            }
+            for version in versions
+        ],
+    }
+
+
+@contextlib.contextmanager
+def local_stand_ins(fake_chrome=True):
+    root = tempfile.mkdtemp(prefix="tgc-bench-")
+    www = os.path.join(root, "www")
+    bin_dir = os.path.join(root, "bin")
+    os.makedirs(www)
+    os.makedirs(bin_dir)
+
+    with zipfile.ZipFile(os.path.join(www, "chromedriver-linux64.zip"), "w") as z:
+        z.writestr(
+            "chromedriver-linux64/chromedriver",
+            os.urandom(FAKE_CHROMEDRIVER_SIZE),
+            compress_type=zipfile.ZIP_STORED,
+        )
+        z.writestr("chromedriver-linux64/LICENSE.chromedriver", "license")
+        z.writestr("chromedriver-linux64/THIRD_PARTY_NOTICES.chromedriver", "x" * 4096)
+    with open(os.path.join(www, "index.html"), "w") as fh:
+        fh.write(TEST_PAGE)
+
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(_QuietHandler, directory=www)
+    )
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    with open(os.path.join(www, "known-good-versions-with-downloads.json"), "w") as fh:
+        json.dump(_fake_manifest(base_url), fh)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    saved_environ = dict(os.environ)
+    if fake_chrome:
+        fake_chrome_path = os.path.join(bin_dir, "google-chrome-stable")
+        with open(fake_chrome_path, "w") as fh:
+            fh.write(f'#!/bin/sh\necho "Google Chrome {FAKE_CHROME_VERSION}"\n')
+        os.chmod(fake_chrome_path, 0o755)
+        os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+
+    try:
+        yield {
+            "root": root,
+            "base_url": base_url,
+            "manifest_url": f"{base_url}/known-good-versions-with-downloads.json",
+            "zip_url": f"{base_url}/chromedriver-linux64.zip",
+            "page_url": f"{base_url}/index.html",
+        }
+    finally:
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        server.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+class _CdpStandIn:
+    """Just enough of a driver for stealth setup: every CDP command costs one
+    simulated round trip."""
+
+    capabilities = {"browserVersion": FAKE_CHROME_VERSION}
+
+    def __init__(self):
+        self.cdp_calls = 0
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        self.cdp_calls += 1
+        time.sleep(FAKE_CDP_ROUND_TRIP_SECONDS)
+        return {"userAgent": f"Mozilla/5.0 HeadlessChrome/{FAKE_CHROME_VERSION}"}
+
+
+def percentile(samples, q) -> float:
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(q * (len(ordered) - 1))))
+    return ordered[rank]
+
+
+def summarize(samples) -> dict:
+    return {
+        "n": len(samples),
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "mean_ms": sum(samples) / len(samples) * 1000,
+    }
+
+
+def time_phase(fn, runs, setup=None, warmup=0) -> list:
+    for _ in range(warmup):
+        fn(setup()) if setup else fn()
+    samples = []
+    for _ in range(runs):
+        state = setup() if setup else None
+        started_at = time.perf_counter()
+        fn(state) if setup else fn()
+        samples.append(time.perf_counter() - started_at)
+    return samples
+
+
+def offline_phases(stand_ins, runs) -> dict:
+    results = {}
+    root = stand_ins["root"]
+    manifest_url = stand_ins["manifest_url"]
+
+    def resolve(base):
+        return update_chromedriver.match_chromedriver_to_chrome_browser(
+            chromedrivers_base_path=base, known_good_versions_url=manifest_url
+        )
+
+    # download: fresh empty store every run
+    def fresh_store():
+        resolution_cache.clear_resolution_memo()
+        return tempfile.mkdtemp(dir=root)
+
+    results["resolve_download"] = time_phase(resolve, runs, setup=fresh_store)
+
+    # cache hit, served from the in-process memo
+    hit_store = fresh_store()
+    resolve(hit_store)
+    results["resolve_cache_hit_memo"] = time_phase(lambda: resolve(hit_store), runs)
+
+    # cache hit, served from resolution_cache.json as in a fresh worker
+    def clear_memo():
+        resolution_cache.clear_resolution_memo()
+        return hit_store
+
+    results["resolve_cache_hit_manifest"] = time_phase(resolve, runs, setup=clear_memo)
+
+    # a different chromedriver of the same major is installed; no resolution cache
+    same_major_store = fresh_store()
+    driver_dir = os.path.join(
+        same_major_store, FAKE_LOCAL_SAME_MAJOR_VERSION, "chromedriver-linux64"
+    )
+    os.makedirs(driver_dir)
+    with open(os.path.join(driver_dir, "chromedriver"), "w") as fh:
+        fh.write("#!/bin/sh\n")
+
+    def forget_resolution():
+        resolution_cache.clear_resolution_memo()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(
+                os.path.join(
+                    same_major_store, resolution_cache.RESOLUTION_CACHE_FILENAME
+                )
+            )
+        return same_major_store
+
+    results["resolve_same_major_hit"] = time_phase(
+        resolve, runs, setup=forget_resolution
+    )
+
+    download_dir = tempfile.mkdtemp(dir=root)
+    results["download_binary_file"] = time_phase(
+        lambda: downloads.download_binary_file(
+            stand_ins["zip_url"], os.path.join(download_dir, "chromedriver.zip")
+        ),
+        runs,
+    )
+
+    try:
+        for use_sw_uc in (True, False):
+            name = "chrome_options_sw_uc" if use_sw_uc else "chrome_options_selenium"
+            results[name] = time_phase(
+                lambda: build_chrome_options(use_sw_uc=use_sw_uc),
+                runs,
+                # the first call pays for importing the backend
+                warmup=1,
+            )
+    except ImportError as exc:
+        print(f"skipping ChromeOptions phases: {exc}", file=sys.stderr)
+
+    try:
+        import selenium_stealth
+
+        # the stand-in is not a selenium Chrome, which stealth() insists on
+        with unittest.mock.patch.object(selenium_stealth, "Driver", _CdpStandIn):
+            results["stealth_per_evasion"] = time_phase(
+                lambda driver: selenium_stealth.stealth(
+                    driver, **DEFAULT_STEALTH_OPTIONS
+                ),
+                runs,
+                setup=_CdpStandIn,
+            )
+        # the first call builds the combined script
+        results["stealth_precompiled"] = time_phase(
+            lambda driver: apply_stealth(driver), runs, setup=_CdpStandIn, warmup=1
+        )
+    except ImportError as exc:
+        print(f"skipping stealth phases: {exc}", file=sys.stderr)
+
+    return results
+
+
+def live_phases(stand_ins, runs, backends) -> dict:
+    import selenium_stealth
+
+    results = {}
+    for backend in backends:
+        kwargs = dict(BACKENDS[backend], use_selenium_stealth=False)
+        for phase in ("launch", "stealth", "stealth_per_evasion", "first_get", "quit"):
+            results[f"{backend}_{phase}"] = []
+
+        for run in range(runs):
+            started_at = time.perf_counter()
+            driver = tgc.get_chromedriver(**kwargs)
+            results[f"{backend}_launch"].append(time.perf_counter() - started_at)
+
+            try:
+                # alternate launches between selenium-stealth's one CDP call
+                # per evasion and the single precompiled script
+                if run % 2:
+                    phase = "stealth_per_evasion"
+                    started_at = time.perf_counter()
+                    selenium_stealth.stealth(driver, **DEFAULT_STEALTH_OPTIONS)
+                else:
+                    phase = "stealth"
+                    started_at = time.perf_counter()
+                    apply_stealth(driver)
+                results[f"{backend}_{phase}"].append(time.perf_counter() - started_at)
+
+                started_at = time.perf_counter()
+                driver.get(stand_ins["page_url"])
+                results[f"{backend}_first_get"].append(time.perf_counter() - started_at)
+            finally:
+                started_at = time.perf_counter()
+                driver.quit()
+                results[f"{backend}_quit"].append(time.perf_counter() - started_at)
+
+    return {name: samples for name, samples in results.items() if samples}
+
+
+def compare(summaries, baseline, tolerance, min_delta_ms) -> list:
+    regressions = []
+    for name, summary in summaries.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["p50_ms"]
+        after = summary["p50_ms"]
+        if after > before * (1 + tolerance) and after - before > min_delta_ms:
+            regressions.append(name)
+    return regressions
+
+
+def print_table(summaries, baseline=None) -> None:
+    header = f"{'phase':<32} {'n':>4} {'p50 ms':>10} {'p95 ms':>10} {'mean ms':>10}"
+    if baseline:
+        header += f" {'base p50':>10} {'change':>8}"
+    print(header)
+    for name, s in summaries.items():
+        line = f"{name:<32} {s['n']:>4} {s['p50_ms']:>10.2f} {s['p95_ms']:>10.2f} {s['mean_ms']:>10.2f}"
+        if baseline and name in baseline:
+            before = baseline[name]["p50_ms"]
+            change = (s["p50_ms"] - before) / before * 100 if before else 0.0
+            line += f" {before:>10.2f} {change:>+7.1f}%"
+        print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Time each phase of resolving and launching a chromedriver."
+    )
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help="also launch real browsers (needs google-chrome-stable on PATH)",
+    )
+    parser.add_argument(
+        "--backends", nargs="+", choices=sorted(BACKENDS), default=["sw_uc"]
+    )
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed p50 slowdown against the baseline, as a fraction",
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=1.0,
+        help="ignore p50 slowdowns smaller than this",
+    )
+    args = parser.parse_args(argv)
+
+    results = {"import_package": [measure_import_ms() / 1000 for _ in range(args.runs)]}
+    with local_stand_ins() as stand_ins:
+        results.update(offline_phases(stand_ins, args.runs))
+    if args.live:
+        with local_stand_ins(fake_chrome=False) as stand_ins:
+            results.update(live_phases(stand_ins, args.runs, args.backends))
+
+    summaries = {name: summarize(samples) for name, samples in results.items()}
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)["phases"]
+    print_table(summaries, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as fh:
+            json.dump({"phases": summaries}, fh, indent=2, sort_keys=True)
+
+    if baseline:
+        if regressions := compare(
+            summaries, baseline, args.tolerance, args.min_delta_ms
+        ):
+            print(f"REGRESSED: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -36,19 +36,14 @@ def get_page_source3(driver=None, url=None):
     if not url:
         raise Exception("url must be provided")
     try:
-        got_200_response = False
-        driver.get(url)
-        for r in driver.requests:
-            if r.response:
-                if r.url == url and r.response.status_code == 200:
-                    got_200_response = True
+        # the captured response body, without serializing the DOM
+        result = tgc.fetch(driver, url)
     except Exception as exc:
         logger.warning(str(exc))
         raise
 
-    if got_200_response:
-        html = driver.page_source
-        return html
+    if result.status == 200:
+        return result.text
 
     raise Exception("Did not get a 200 response")
 
@@ -64,7 +59,7 @@ def shutdown_driver(driver=None):
             logger.warning(exc_str)
 
 
-def get_page_source2(url=None, proxy_string_gen_instance=None):
+def get_page_source2(url=None, proxy_selector=None):
     inter_scrape_delay = 2
     attempts_left = 4
 
@@ -73,11 +68,10 @@ def get_page_source2(url=None, proxy_string_gen_instance=None):
 
         time.sleep(inter_scrape_delay)
 
-        # get driver
-        proxy_string = next(proxy_string_gen_instance)
+        # get driver; the selector hears about launch and fetch outcomes itself
         try:
             driver = tgc.get_chromedriver(
-                proxy_string=proxy_string,
+                proxy_selector=proxy_selector,
             )
         except Exception as exc:
             logger.warning(str(exc))
@@ -122,6 +116,9 @@ def get_page_source2(url=None, proxy_string_gen_instance=None):
                     break
 
         if found_hint_of_error or found_specific_error:
+            # the page loaded, but through a proxy that failed upstream
+            if proxy_selector is not None:
+                proxy_selector.report(driver.proxy_string, False)
             inter_scrape_delay *= 2
 
         else:
@@ -227,9 +224,7 @@ if __name__ == "__main__":
 
     html = get_page_source2(
         url=url,
-        proxy_string_gen_instance=get_proxy_string_gen_instance(
-            proxy_credentials=proxy_credentials
-        ),
+        proxy_selector=tgc.ProxySelector(proxy_credentials),
     )
 
     with open("out.html", mode="w", encoding="utf-8") as fh:
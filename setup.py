@@ -15,6 +15,11 @@ setup(
         "undetected-chromedriver>=3.5,<4.0",
     ],
     python_requires=">=3.6",
+    entry_points={
+        "console_scripts": [
+            "tgc-prefetch=timbos_get_chromedriver.update_chromedriver.prefetch:main",
+        ],
+    },
     description="Provide a chromedriver instance",
     author="Tim Stewart",
     author_email="tim@texastim.dev",
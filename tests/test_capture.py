@@ -0,0 +1,98 @@
+import types
+
+from timbos_get_chromedriver.capture import CaptureIndex, CapturePolicy
+
+
+class FakeStorage:
+    def __init__(self):
+        self.requests = []
+        self.responses = {}
+
+    def save_request(self, request):
+        self.requests.append(request)
+
+    def save_response(self, request_id, response):
+        self.responses[request_id] = response
+
+    def clear_requests(self):
+        self.requests.clear()
+        self.responses.clear()
+
+    def load_requests(self):
+        return list(self.requests)
+
+
+def _request(request_id, url):
+    return types.SimpleNamespace(id=request_id, method="GET", url=url)
+
+
+def _response(body=b"", content_type="text/html", status_code=200):
+    return types.SimpleNamespace(
+        status_code=status_code,
+        reason="OK",
+        headers={"Content-Type": content_type},
+        body=body,
+    )
+
+
+def test_indexes_the_latest_capture_by_url():
+    storage = FakeStorage()
+    index = CaptureIndex(storage, CapturePolicy())
+    for request_id, status in [("1", 500), ("2", 200)]:
+        storage.save_request(_request(request_id, "https://example.com/"))
+        storage.save_response(request_id, _response(status_code=status))
+
+    assert index.status("https://example.com/") == 200
+    assert index.load_request("https://example.com/").id == "2"
+    assert index.status("https://example.com/other") is None
+
+
+def test_drops_bodies_without_touching_the_original():
+    storage = FakeStorage()
+    index = CaptureIndex(
+        storage,
+        CapturePolicy(exclude_content_types=["image/"], max_body_bytes=10),
+    )
+    cases = [
+        ("1", _response(b"small")),
+        ("2", _response(b"x" * 11)),
+        ("3", _response(b"png", content_type="image/png")),
+    ]
+    for request_id, response in cases:
+        storage.save_request(_request(request_id, f"https://example.com/{request_id}"))
+        storage.save_response(request_id, response)
+
+    assert storage.responses["1"].body == b"small"
+    assert storage.responses["2"].body == b""
+    assert storage.responses["3"].body == b""
+    assert cases[1][1].body == b"x" * 11
+    assert [e.body_dropped for e in index.entries()] == [False, True, True]
+    assert index.stats()["bodies_dropped"] == 2
+
+
+def test_eviction_bounds_the_index_and_pending_set():
+    storage = FakeStorage()
+    index = CaptureIndex(storage, CapturePolicy(), max_entries=3)
+    for i in range(10):
+        storage.save_request(_request(str(i), f"https://example.com/{i}"))
+
+    assert len(index) == 3
+    assert index.get("https://example.com/0") is None
+    assert index.activity()[0] == 3
+
+
+def test_stale_pending_requests_are_dropped():
+    storage = FakeStorage()
+    index = CaptureIndex(storage, CapturePolicy())
+    storage.save_request(_request("1", "https://example.com/"))
+    assert index.activity(stale_after=60)[0] == 1
+    assert index.activity(stale_after=0)[0] == 0
+
+
+def test_clearing_the_store_clears_the_index():
+    storage = FakeStorage()
+    index = CaptureIndex(storage, CapturePolicy())
+    storage.save_request(_request("1", "https://example.com/"))
+    storage.clear_requests()
+    assert len(index) == 0
+    assert index.activity()[0] == 0
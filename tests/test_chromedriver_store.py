@@ -0,0 +1,93 @@
+import json
+import os
+import threading
+
+from timbos_get_chromedriver.update_chromedriver import chromedriver_store, store_lock
+
+
+def _install(base, version, size=10):
+    path = os.path.join(base, version, "chromedriver-linux64")
+    os.makedirs(path)
+    with open(os.path.join(path, "chromedriver"), "wb") as fh:
+        fh.write(b"x" * size)
+
+
+def _set_last_used(base, last_used):
+    index = chromedriver_store.load_store_index(base)
+    for version, when in last_used.items():
+        index["versions"][version]["last_used"] = when
+    chromedriver_store.save_store_index(base, index)
+
+
+def test_concurrent_index_updates_keep_every_version(tmp_path):
+    base = str(tmp_path)
+    versions = [f"120.0.0.{i}" for i in range(16)]
+    for version in versions:
+        _install(base, version)
+
+    threads = [
+        threading.Thread(
+            target=chromedriver_store.record_chromedriver_install, args=(base, v)
+        )
+        for v in versions
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(os.path.join(base, chromedriver_store.STORE_INDEX_FILENAME)) as fh:
+        assert sorted(json.load(fh)["versions"]) == sorted(versions)
+    assert not [name for name in os.listdir(base) if name.endswith(".tmp")]
+
+
+def test_use_keeps_pinned_flag(tmp_path):
+    base = str(tmp_path)
+    _install(base, "120.0.0.1")
+    chromedriver_store.record_chromedriver_install(base, "120.0.0.1", pinned=True)
+    _set_last_used(base, {"120.0.0.1": 0})
+
+    chromedriver_store.record_chromedriver_use(base, "120.0.0.1")
+
+    entry = chromedriver_store.load_store_index(base)["versions"]["120.0.0.1"]
+    assert entry["pinned"] is True
+    assert entry["last_used"] > 0
+
+
+def test_index_updates_reenter_the_store_lock(tmp_path):
+    base = str(tmp_path)
+    _install(base, "120.0.0.1")
+    # as match_chromedriver_to_chrome_browser() does while installing
+    with store_lock.store_lock(base):
+        chromedriver_store.record_chromedriver_install(base, "120.0.0.1")
+    assert "120.0.0.1" in chromedriver_store.load_store_index(base)["versions"]
+
+
+def test_evicts_least_recently_used_but_not_pinned_or_kept(tmp_path):
+    base = str(tmp_path)
+    for version in ["118.0.0.1", "119.0.0.1", "120.0.0.1", "121.0.0.1"]:
+        _install(base, version)
+        chromedriver_store.record_chromedriver_install(base, version)
+    chromedriver_store.record_chromedriver_install(base, "118.0.0.1", pinned=True)
+    _set_last_used(
+        base, {"118.0.0.1": 1, "119.0.0.1": 2, "120.0.0.1": 3, "121.0.0.1": 4}
+    )
+
+    evicted = chromedriver_store.evict_chromedrivers(
+        base, max_versions=3, keep=("119.0.0.1",)
+    )
+
+    assert evicted == ["120.0.0.1"]
+    assert sorted(chromedriver_store.load_store_index(base)["versions"]) == [
+        "118.0.0.1",
+        "119.0.0.1",
+        "121.0.0.1",
+    ]
+    assert not os.path.exists(os.path.join(base, "120.0.0.1"))
+
+
+def test_no_limits_evict_nothing(tmp_path):
+    base = str(tmp_path)
+    _install(base, "120.0.0.1")
+    assert chromedriver_store.evict_chromedrivers(base, max_versions=None) == []
+    assert os.path.isdir(os.path.join(base, "120.0.0.1"))
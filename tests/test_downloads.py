@@ -0,0 +1,69 @@
+import http.server
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("requests")
+
+from timbos_get_chromedriver.update_chromedriver.downloads import download_binary_file
+
+# several download chunks, so that whole chunks reach disk before the drop
+BODY = bytes(range(256)) * 4096 * 4
+
+
+class FlakyHandler(http.server.BaseHTTPRequestHandler):
+    """Drops the first response partway, then serves Range requests."""
+
+    requests_seen = []
+
+    def do_GET(self):
+        range_header = self.headers.get("Range")
+        self.requests_seen.append(range_header)
+        if range_header is None:
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY[: len(BODY) * 5 // 8])
+            self.close_connection = True
+            return
+        start = int(range_header.split("=")[1].rstrip("-"))
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{len(BODY) - 1}/{len(BODY)}")
+        self.send_header("Content-Length", str(len(BODY) - start))
+        self.end_headers()
+        self.wfile.write(BODY[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    FlakyHandler.requests_seen = []
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/chromedriver.zip"
+    server.shutdown()
+    server.server_close()
+
+
+def test_interrupted_download_resumes_with_range(server, tmp_path):
+    path = str(tmp_path / "chromedriver.zip")
+    stats = download_binary_file(server, path, backoff=0)
+
+    with open(path, "rb") as fh:
+        assert fh.read() == BODY
+    assert stats["attempts"] == 2
+    assert stats["resumed_from"] > 0
+    assert FlakyHandler.requests_seen == [None, f"bytes={stats['resumed_from']}-"]
+    assert not os.path.exists(f"{path}.part")
+
+
+def test_size_mismatch_fails_verification(server, tmp_path):
+    path = str(tmp_path / "chromedriver.zip")
+    with pytest.raises(Exception, match="failed verification"):
+        download_binary_file(server, path, expected_size=len(BODY) + 1, backoff=0)
+    assert not os.path.exists(path)
+    assert not os.path.exists(f"{path}.part")
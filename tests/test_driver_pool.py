@@ -0,0 +1,49 @@
+import threading
+import time
+
+from timbos_get_chromedriver import driver_pool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_calls = 0
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+def _patch_launches(monkeypatch, launch_seconds=0.0):
+    launched = []
+    lock = threading.Lock()
+
+    def get_chromedriver(**kwargs):
+        time.sleep(launch_seconds)
+        driver = FakeDriver()
+        with lock:
+            launched.append(driver)
+        return driver
+
+    monkeypatch.setattr(driver_pool, "get_chromedriver", get_chromedriver)
+    return launched
+
+
+def test_close_cancels_queued_refills(monkeypatch):
+    launched = _patch_launches(monkeypatch, launch_seconds=0.2)
+    pool = driver_pool.DriverPool(size=4, refill_workers=1)
+    time.sleep(0.05)
+    pool.close()
+    time.sleep(0.4)
+
+    # only the launch already running when the pool closed went ahead
+    assert len(launched) == 1
+    assert launched[0].quit_calls == 1
+
+
+def test_leased_driver_is_quit_on_release_after_close(monkeypatch):
+    launched = _patch_launches(monkeypatch)
+    pool = driver_pool.DriverPool(size=1)
+    driver = pool.acquire(timeout=5)
+    pool.close()
+    pool.release(driver)
+    assert driver.quit_calls == 1
+    assert all(d.quit_calls == 1 for d in launched)
@@ -0,0 +1,32 @@
+import importlib
+
+import pytest
+
+from timbos_get_chromedriver import get_chromedrivers
+
+# the package exports a get_chromedriver function under the module's name
+get_chromedriver_module = importlib.import_module(
+    "timbos_get_chromedriver.get_chromedriver"
+)
+
+
+@pytest.fixture
+def no_resolution(monkeypatch):
+    def match_chromedriver_to_chrome_browser(**kwargs):
+        raise AssertionError("resolved a chromedriver")
+
+    monkeypatch.setattr(
+        get_chromedriver_module.update_chromedriver,
+        "match_chromedriver_to_chrome_browser",
+        match_chromedriver_to_chrome_browser,
+    )
+
+
+def test_zero_drivers_resolves_nothing(no_resolution):
+    result = get_chromedrivers(0)
+    assert result["drivers"] == [] and result["resolve_seconds"] == 0.0
+
+
+def test_negative_count_fails_before_resolving(no_resolution):
+    with pytest.raises(Exception, match="Cannot launch -1 drivers"):
+        get_chromedrivers(-1)
@@ -0,0 +1,52 @@
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# as documented for benchmarks/bench_import.py
+IMPORT_BUDGET_MS = 150.0
+IMPORT_RUNS = 5
+
+# a bare `import timbos_get_chromedriver` must not pull in any of these
+LAZY_MODULES = [
+    "requests",
+    "selenium",
+    "selenium_stealth",
+    "seleniumbase",
+    "seleniumwire",
+    "undetected_chromedriver",
+]
+
+
+def _run(*args) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def _import_ms() -> float:
+    # -X importtime writes "import time: self | cumulative | name" lines to stderr
+    stderr = _run("-X", "importtime", "-c", "import timbos_get_chromedriver").stderr
+    for line in stderr.splitlines():
+        fields = [f.strip() for f in line.split("|")]
+        if len(fields) == 3 and fields[2] == "timbos_get_chromedriver":
+            return int(fields[1]) / 1000.0
+    raise Exception("No importtime line for timbos_get_chromedriver")
+
+
+def test_bare_import_loads_no_backends():
+    loaded = _run(
+        "-c", "import sys, timbos_get_chromedriver; print(' '.join(sys.modules))"
+    ).stdout.split()
+    assert [m for m in LAZY_MODULES if m in loaded] == []
+
+
+def test_import_time_within_budget():
+    median_ms = statistics.median(_import_ms() for _ in range(IMPORT_RUNS))
+    assert median_ms < IMPORT_BUDGET_MS
@@ -0,0 +1,22 @@
+import os
+import threading
+
+from timbos_get_chromedriver.update_chromedriver import known_good_versions
+
+
+def test_concurrent_writes_leave_one_whole_copy(tmp_path):
+    path = str(tmp_path / known_good_versions.KNOWN_GOOD_VERSIONS_CACHE_FILENAME)
+    bodies = [bytes([i]) * 100_000 for i in range(16)]
+
+    threads = [
+        threading.Thread(target=known_good_versions._write_atomically, args=(path, b))
+        for b in bodies
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(path, "rb") as fh:
+        assert fh.read() in bodies
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
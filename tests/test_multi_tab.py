@@ -0,0 +1,60 @@
+import types
+
+from timbos_get_chromedriver.multi_tab import COLLECT_EXPRESSION, fetch_many
+from timbos_get_chromedriver.resource_blocking import ResourceBlocker
+
+
+class FakeDriver:
+    """Answers the CDP calls fetch_many() makes, loading every tab at once."""
+
+    def __init__(self):
+        self.current_window_handle = "main"
+        self.switch_to = types.SimpleNamespace(window=self._switch)
+        self.calls = []  # (target, method)
+        self._target = "main"
+        self._urls = {}
+
+    def _switch(self, handle):
+        self._target = handle
+
+    def execute_cdp_cmd(self, method, params):
+        self.calls.append((self._target, method))
+        if method == "Target.createTarget":
+            return {"targetId": f"tab{len(self._urls)}"}
+        if method == "Page.navigate":
+            self._urls[self._target] = params["url"]
+        if method == "Runtime.evaluate":
+            if params["expression"] == COLLECT_EXPRESSION:
+                url = self._urls[self._target]
+                value = {
+                    "html": "<html></html>",
+                    "final_url": url,
+                    "status": 502 if "bad" in url else 200,
+                    "load_seconds": 0.5,
+                }
+            else:
+                value = True
+            return {"result": {"value": value}}
+        return {}
+
+
+def test_tabs_get_the_block_list_and_report_to_the_selector():
+    driver = FakeDriver()
+    ResourceBlocker(["images"]).attach(driver, use_selenium_wire=False)
+    reports = []
+    driver.proxy_string = "http://proxy:8000"
+    driver.proxy_selector = types.SimpleNamespace(
+        report=lambda *args: reports.append(args)
+    )
+
+    results = list(fetch_many(driver, ["https://a/", "https://bad/"], concurrency=2))
+
+    assert sorted(r["status"] for r in results) == [200, 502]
+    for tab in ("tab0", "tab1"):
+        methods = [m for t, m in driver.calls if t == tab]
+        assert methods.index("Network.setBlockedURLs") < methods.index("Page.navigate")
+    assert sorted(reports) == [
+        ("http://proxy:8000", False, 0.5),
+        ("http://proxy:8000", True, 0.5),
+    ]
+    assert driver._target == "main"
@@ -0,0 +1,45 @@
+import subprocess
+import sys
+import types
+
+import pytest
+
+from timbos_get_chromedriver import process_tree
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="reads /proc"
+)
+
+
+def _fake_driver():
+    process = subprocess.Popen(["sleep", "30"], start_new_session=True)
+    driver = types.SimpleNamespace(service=types.SimpleNamespace(process=process))
+    return driver, process
+
+
+def test_second_quit_does_nothing():
+    driver, process = _fake_driver()
+    calls = []
+    process_tree.install_process_tree_quit(
+        driver, graceful_quit=lambda: calls.append(1)
+    )
+
+    driver.quit()
+    assert process.wait(timeout=5) is not None
+
+    driver.quit()
+    assert calls == [1]
+
+
+def test_reused_root_pid_is_not_signalled():
+    driver, process = _fake_driver()
+    try:
+        # as if the recorded root had exited and its pid been handed out again
+        start_times = {process.pid: process_tree._get_start_time(process.pid) - 1}
+        process_tree.quit_process_tree(
+            driver, lambda: None, root_start_times=start_times
+        )
+        assert process.poll() is None
+    finally:
+        process.kill()
+        process.wait()
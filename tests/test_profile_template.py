@@ -0,0 +1,16 @@
+from timbos_get_chromedriver import profile_template
+
+
+def test_template_name_follows_prefs():
+    name = profile_template.get_profile_template_name
+    assert name("120.0.1", {"a": 1, "b": 2}) == name("120.0.1", {"b": 2, "a": 1})
+    assert name("120.0.1", {"a": 1}) != name("120.0.1", {"a": 2})
+    assert name("120.0.1", {"a": 1}) != name("121.0.1", {"a": 1})
+
+
+def test_unknown_browser_version_skips_template(monkeypatch, tmp_path):
+    monkeypatch.setattr(profile_template, "_get_browser_version", lambda _: None)
+    assert (
+        profile_template.get_profile_template(profile_templates_path=tmp_path) is None
+    )
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+from timbos_get_chromedriver.proxy_selector import ProxySelector
+
+PROXY_CREDENTIALS = {
+    "accounts": {
+        "fast": {
+            "username": "u",
+            "password": "p",
+            "hosts": {"http": [("fast.example", 8000)]},
+        },
+        "slow": {
+            "username": "u",
+            "password": "p",
+            "hosts": {"http": [("slow.example", 8000)]},
+        },
+    },
+    "weights": {"fast": 1, "slow": 1},
+}
+
+
+def test_score_gap_skews_choice():
+    random.seed(0)
+    selector = ProxySelector(PROXY_CREDENTIALS)
+    fast = "http://u:p@fast.example:8000"
+    slow = "http://u:p@slow.example:8000"
+    # equal weights, so the latencies alone make a 50x score gap
+    selector.report(fast, True, latency=0.1)
+    selector.report(slow, True, latency=5.0)
+    scores = {s["proxy_string"]: s["score"] for s in selector.stats()}
+    assert scores[fast] / scores[slow] == pytest.approx(50)
+
+    picks = [selector.choose() for _ in range(5000)]
+    # 50 / 51 of the picks are expected to go to the fast proxy
+    assert picks.count(fast) / len(picks) > 0.95
@@ -0,0 +1,27 @@
+import json
+import os
+import threading
+
+from timbos_get_chromedriver.update_chromedriver import resolution_cache
+
+
+def test_concurrent_remember_writes_valid_json(tmp_path):
+    base = str(tmp_path)
+    chromedriver_path = os.path.join(base, "120.0.0.1", "chromedriver-linux64", "x")
+
+    def remember(i):
+        fingerprint = {"path": f"/opt/chrome{i}", "inode": i, "size": 1, "mtime_ns": 1}
+        resolution_cache.remember_chromedriver(base, fingerprint, chromedriver_path)
+
+    threads = [threading.Thread(target=remember, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(os.path.join(base, resolution_cache.RESOLUTION_CACHE_FILENAME)) as fh:
+        manifest = json.load(fh)
+    assert manifest and all(
+        entry["chromedriver_version"] == "120.0.0.1" for entry in manifest.values()
+    )
+    assert not [name for name in os.listdir(base) if name.endswith(".tmp")]
@@ -0,0 +1,61 @@
+import pytest
+
+from timbos_get_chromedriver.update_chromedriver.version_index import VersionIndex
+
+
+def _manifest(*versions, platform="linux64"):
+    return {
+        "versions": [
+            {
+                "version": version,
+                "downloads": {
+                    "chromedriver": [{"platform": platform, "url": f"u/{version}"}]
+                },
+            }
+            for version in versions
+        ]
+    }
+
+
+@pytest.fixture
+def index():
+    # out of order, and "120.0.6099.9" sorts below "120.0.6099.10" numerically
+    return VersionIndex.from_known_good_versions(
+        _manifest("121.0.6167.85", "120.0.6099.10", "119.0.6045.105", "120.0.6099.9")
+    )
+
+
+def test_exact_match(index):
+    assert index.exact("120.0.6099.9", "linux64") == ("120.0.6099.9", "u/120.0.6099.9")
+    assert index.exact("120.0.6099.11", "linux64") is None
+    assert index.exact("120.0.6099.9", "win64") is None
+
+
+def test_same_major_prefers_highest_at_or_below(index):
+    assert index.same_major("120.0.6099.50", "linux64")[0] == "120.0.6099.10"
+    assert index.same_major("120.0.6099.9", "linux64")[0] == "120.0.6099.9"
+
+
+def test_same_major_falls_back_to_lowest_above(index):
+    assert index.same_major("120.0.1.0", "linux64")[0] == "120.0.6099.9"
+    assert index.same_major("122.0.1.0", "linux64") is None
+
+
+def test_below_the_oldest_entry(index):
+    assert index.highest_at_most("118.0.1.0", "linux64") is None
+    assert index.same_major("118.0.1.0", "linux64") is None
+    assert index.highest_at_most("122.0.1.0", "linux64")[0] == "121.0.6167.85"
+
+
+def test_empty_manifest():
+    for manifest in ({}, {"versions": []}):
+        index = VersionIndex.from_known_good_versions(manifest)
+        assert len(index) == 0
+        assert index.versions("linux64") == []
+        assert index.exact("120.0.6099.9", "linux64") is None
+        assert index.same_major("120.0.6099.9", "linux64") is None
+        assert index.highest_at_most("120.0.6099.9", "linux64") is None
+
+
+def test_round_trips_through_dict(index):
+    assert VersionIndex.from_dict(index.to_dict()).to_dict() == index.to_dict()
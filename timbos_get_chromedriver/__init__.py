@@ -1,3 +1,32 @@
-from .get_chromedriver import get_chromedriver
+from .capture import CapturePolicy
+from .driver_pool import DriverPool
+from .fetch import FetchResult, fetch
+from .get_chromedriver import get_chromedriver, get_chromedrivers
+from .multi_tab import fetch_many
+from .process_tree import reap_orphans, start_orphan_reaper, stop_orphan_reaper
+from .proxy_rotation import ProxyRotation, set_proxy
+from .proxy_selector import ProxySelector
+from .resource_blocking import ResourceBlocker
+from .session_reset import is_driver_reusable, reset_driver
+from .wait_policy import WaitPolicy, wait_for_network_idle
 
-__all__ = ["get_chromedriver"]
+__all__ = [
+    "CapturePolicy",
+    "DriverPool",
+    "fetch",
+    "fetch_many",
+    "FetchResult",
+    "get_chromedriver",
+    "get_chromedrivers",
+    "is_driver_reusable",
+    "ProxyRotation",
+    "ProxySelector",
+    "reap_orphans",
+    "reset_driver",
+    "ResourceBlocker",
+    "set_proxy",
+    "start_orphan_reaper",
+    "stop_orphan_reaper",
+    "wait_for_network_idle",
+    "WaitPolicy",
+]
@@ -0,0 +1,160 @@
+import asyncio
+import contextlib
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .get_chromedriver import get_chromedriver
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_AIO_MAX_WORKERS = min(32, 4 * (os.cpu_count() or 1))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=DEFAULT_AIO_MAX_WORKERS, thread_name_prefix="tgc-aio"
+            )
+        return _executor
+
+
+def configure_executor(max_workers: int) -> None:
+    # every blocking driver call made through this module runs on this executor,
+    # so its size bounds how many browsers can be busy at once
+    global _executor
+    with _executor_lock:
+        old_executor = _executor
+        _executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="tgc-aio"
+        )
+    if old_executor is not None:
+        old_executor.shutdown(wait=False)
+
+
+def _consume_result(future) -> None:
+    # a call whose awaiter was cancelled still finishes in its thread; retrieve
+    # the outcome so asyncio doesn't warn about an exception never retrieved
+    if not future.cancelled():
+        future.exception()
+
+
+def _quit_if_launched(future) -> None:
+    if future.cancelled() or future.exception() is not None:
+        return
+    logger.info("Quitting a driver whose launch was cancelled or timed out")
+    get_executor().submit(_quit_quietly, future.result())
+
+
+def _quit_quietly(driver) -> None:
+    try:
+        driver.quit()
+    except Exception as exc:
+        logger.debug(f"Error quitting driver: {exc}")
+
+
+class AsyncChromeDriver:
+    """Runs the blocking calls of one driver on the aio executor, one at a time.
+
+    get(), page_source(), current_url() and execute_script() cover the common
+    calls; run(fn, *args) runs any other blocking call, e.g.
+    `await driver.run(driver.driver.find_element, "id", "main")`.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._lock = asyncio.Lock()
+        self._quit = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # shielded so that cancelling the surrounding task can't skip the quit
+        await asyncio.shield(self.quit())
+
+    async def run(self, fn, *args, timeout=None, **kwargs):
+        await self._lock.acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(
+                get_executor(), functools.partial(fn, *args, **kwargs)
+            )
+        except BaseException:
+            self._lock.release()
+            raise
+
+        # the lock is held until the call really finishes, even if the awaiter
+        # gives up early, so the next command never overlaps a running one
+        future.add_done_callback(lambda _: self._lock.release())
+        future.add_done_callback(_consume_result)
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+    async def get(self, url, timeout=None):
+        return await self.run(self.driver.get, url, timeout=timeout)
+
+    async def page_source(self, timeout=None):
+        return await self.run(lambda: self.driver.page_source, timeout=timeout)
+
+    async def current_url(self, timeout=None):
+        return await self.run(lambda: self.driver.current_url, timeout=timeout)
+
+    async def execute_script(self, script, *args, timeout=None):
+        return await self.run(
+            self.driver.execute_script, script, *args, timeout=timeout
+        )
+
+    async def quit(self, timeout=None):
+        if self._quit:
+            return
+        self._quit = True
+        # deliberately not serialized behind self._lock: quitting is how a
+        # command that hangs gets unstuck
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(get_executor(), _quit_quietly, self.driver)
+        future.add_done_callback(_consume_result)
+        await asyncio.wait_for(asyncio.shield(future), timeout)
+
+
+async def aget_chromedriver(*, timeout=None, **chromedriver_kwargs):
+    """Launch a driver with get_chromedriver(**chromedriver_kwargs) on the aio
+    executor and wrap it in an AsyncChromeDriver.
+
+        driver = await aget_chromedriver(timeout=120, headless=True)
+        try:
+            await driver.get(url, timeout=60)
+            html = await driver.page_source()
+        finally:
+            await driver.quit()
+
+    A launch that times out or is cancelled still finishes in its thread; the
+    driver is quit once it exists.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(
+        get_executor(), functools.partial(get_chromedriver, **chromedriver_kwargs)
+    )
+    try:
+        driver = await asyncio.wait_for(asyncio.shield(future), timeout)
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        # the launch can't be interrupted, so quit the driver once it exists
+        future.add_done_callback(_quit_if_launched)
+        raise
+    return AsyncChromeDriver(driver)
+
+
+@contextlib.asynccontextmanager
+async def achromedriver(*, timeout=None, **chromedriver_kwargs):
+    """aget_chromedriver() as an async context manager that quits the driver
+    on the way out."""
+    async_driver = await aget_chromedriver(timeout=timeout, **chromedriver_kwargs)
+    async with async_driver:
+        yield async_driver
@@ -0,0 +1,233 @@
+import collections
+import copy
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_INDEXED_REQUESTS = 10_000
+
+
+class CapturePolicy:
+    """What a selenium-wire driver records, and where.
+
+    scopes: regexes; only matching request urls are captured
+    exclude_hosts: hosts that bypass the capturing proxy entirely
+    exclude_content_types: content type prefixes whose response bodies are dropped
+    max_body_bytes: response bodies larger than this are dropped
+    max_requests: ring-buffer size of the request store (memory storage only)
+    storage: "memory" or "disk"
+    """
+
+    def __init__(
+        self,
+        *,
+        scopes=None,
+        exclude_hosts=None,
+        exclude_content_types=None,
+        max_body_bytes=None,
+        max_requests=None,
+        storage="memory",
+        storage_base_dir=None,
+        ignore_http_methods=("OPTIONS",),
+    ):
+        if storage not in ("memory", "disk"):
+            raise Exception(
+                f"Capture storage must be 'memory' or 'disk', not {storage!r}."
+            )
+        if max_requests is not None and storage != "memory":
+            # selenium-wire only bounds its in-memory store
+            raise Exception("max_requests requires storage='memory'.")
+
+        self.scopes = list(scopes or [])
+        self.exclude_hosts = list(exclude_hosts or [])
+        self.exclude_content_types = tuple(
+            t.lower() for t in (exclude_content_types or [])
+        )
+        self.max_body_bytes = max_body_bytes
+        self.max_requests = max_requests
+        self.storage = storage
+        self.storage_base_dir = storage_base_dir
+        self.ignore_http_methods = list(ignore_http_methods or [])
+
+    def seleniumwire_options(self) -> dict:
+        options = {"ignore_http_methods": self.ignore_http_methods}
+        if self.exclude_hosts:
+            options["exclude_hosts"] = self.exclude_hosts
+        if self.storage == "memory":
+            options["request_storage"] = "memory"
+            if self.max_requests is not None:
+                options["request_storage_max_size"] = self.max_requests
+        if self.storage_base_dir:
+            options["request_storage_base_dir"] = self.storage_base_dir
+        return options
+
+    def keep_body(self, response) -> bool:
+        if self.exclude_content_types:
+            content_type = (response.headers.get("Content-Type") or "").lower()
+            if content_type.startswith(self.exclude_content_types):
+                return False
+        if self.max_body_bytes is not None:
+            if len(response.body or b"") > self.max_body_bytes:
+                return False
+        return True
+
+
+class CaptureEntry:
+    __slots__ = (
+        "request_id",
+        "method",
+        "url",
+        "status_code",
+        "reason",
+        "content_type",
+        "body_size",
+        "body_dropped",
+    )
+
+    def __init__(self, request_id, method, url):
+        self.request_id = request_id
+        self.method = method
+        self.url = url
+        self.status_code = None
+        self.reason = None
+        self.content_type = None
+        self.body_size = None
+        self.body_dropped = False
+
+    def __repr__(self):
+        return f"<CaptureEntry {self.method} {self.url} {self.status_code}>"
+
+
+class CaptureIndex:
+    """Wraps a selenium-wire request store, applying a CapturePolicy's body
+    filters as responses are saved and indexing every capture by url.
+
+    The index holds metadata only, so it stays small even with disk storage.
+    """
+
+    def __init__(self, storage, policy, max_entries=None):
+        self.policy = policy
+        if max_entries is None:
+            max_entries = policy.max_requests or DEFAULT_MAX_INDEXED_REQUESTS
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._by_id = collections.OrderedDict()
+        self._by_url = {}
+        self._pending = {}  # request id -> monotonic time it was saved
+        self._last_activity = time.monotonic()
+        self._stats = {"captured": 0, "bodies_dropped": 0}
+
+        self._storage = storage
+        self._save_request = storage.save_request
+        self._save_response = storage.save_response
+        self._clear_requests = storage.clear_requests
+        storage.save_request = self._on_save_request
+        storage.save_response = self._on_save_response
+        storage.clear_requests = self._on_clear_requests
+
+    def _on_save_request(self, request):
+        self._save_request(request)
+        entry = CaptureEntry(request.id, request.method, request.url)
+        with self._lock:
+            self._by_id[request.id] = entry
+            self._by_url[request.url] = entry
+            self._pending[request.id] = self._last_activity = time.monotonic()
+            self._stats["captured"] += 1
+            while len(self._by_id) > self.max_entries:
+                evicted_id, evicted = self._by_id.popitem(last=False)
+                self._pending.pop(evicted_id, None)
+                if self._by_url.get(evicted.url) is evicted:
+                    del self._by_url[evicted.url]
+
+    def _on_save_response(self, request_id, response):
+        body_size = len(response.body or b"")
+        body_dropped = not self.policy.keep_body(response)
+        if body_dropped:
+            # the proxy may still hold this object, so strip the body on a
+            # shallow copy; the body itself is never copied
+            response = copy.copy(response)
+            response.body = b""
+        self._save_response(request_id, response)
+
+        with self._lock:
+            self._pending.pop(request_id, None)
+            self._last_activity = time.monotonic()
+            if body_dropped:
+                self._stats["bodies_dropped"] += 1
+            if entry := self._by_id.get(request_id):
+                entry.status_code = response.status_code
+                entry.reason = response.reason
+                entry.content_type = response.headers.get("Content-Type")
+                entry.body_size = body_size
+                entry.body_dropped = body_dropped
+
+    def _on_clear_requests(self):
+        self._clear_requests()
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_id.clear()
+            self._by_url.clear()
+            self._pending.clear()
+
+    def get(self, url):
+        """The most recent capture of `url`, or None."""
+        with self._lock:
+            return self._by_url.get(url)
+
+    def status(self, url):
+        """The status code of the most recent response from `url`, or None."""
+        if entry := self.get(url):
+            return entry.status_code
+        return None
+
+    def load_request(self, url):
+        """The stored selenium-wire request (with its response) most recently
+        made to `url`, or None."""
+        if (entry := self.get(url)) is None:
+            return None
+        # selenium-wire's stores only look requests up by id privately
+        for name in ("_get_request", "_load_request"):
+            if load := getattr(self._storage, name, None):
+                return load(entry.request_id)
+        for request in reversed(self._storage.load_requests()):
+            if request.id == entry.request_id:
+                return request
+        return None
+
+    def activity(self, stale_after=None):
+        """(requests awaiting a response, monotonic time of the last request or
+        response). Requests older than `stale_after` seconds are dropped, since
+        one that failed upstream never gets a response."""
+        with self._lock:
+            if stale_after is not None:
+                cutoff = time.monotonic() - stale_after
+                for request_id in [i for i, t in self._pending.items() if t < cutoff]:
+                    del self._pending[request_id]
+            return len(self._pending), self._last_activity
+
+    def entries(self) -> list:
+        with self._lock:
+            return list(self._by_id.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, indexed=len(self._by_id))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._by_id)
+
+
+def attach_capture(driver, policy):
+    """Apply `policy` to a selenium-wire `driver` and expose its index as
+    `driver.capture`."""
+    if policy.scopes:
+        driver.scopes = policy.scopes
+    driver.capture = CaptureIndex(driver.backend.storage, policy)
+    return driver.capture
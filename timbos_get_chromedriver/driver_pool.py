@@ -0,0 +1,265 @@
+import collections
+import contextlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .get_chromedriver import get_chromedriver
+from .session_reset import reset_driver
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledDriver:
+    __slots__ = ("driver", "created_at", "uses")
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.uses = 0
+
+
+class DriverPool:
+    """Keeps `size` fully configured drivers launched in the background.
+
+    All keyword arguments not consumed by the pool are passed through to
+    `get_chromedriver()` for every launch. With `reset_level` set, returned
+    drivers are reset with `reset_driver()` and retired if that fails.
+    """
+
+    def __init__(
+        self,
+        size=2,
+        *,
+        max_uses=None,
+        max_age=None,
+        refill_workers=None,
+        reset_level=None,
+        **chromedriver_kwargs,
+    ):
+        if size < 1:
+            raise Exception(f"Pool size must be at least 1, not {size}.")
+
+        self.size = size
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.reset_level = reset_level
+        self.chromedriver_kwargs = chromedriver_kwargs
+
+        self._cond = threading.Condition()
+        self._idle = collections.deque()
+        self._leased = {}
+        self._launching = 0
+        self._launch_failures_seen = 0
+        self._last_launch_error = None
+        self._closed = False
+        # quit future -> retired driver, for quits that may still be queued
+        self._pending_quits = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=refill_workers or size,
+            thread_name_prefix="tgc-pool",
+        )
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "leases": 0,
+            "launches": 0,
+            "launch_failures": 0,
+            "retired": 0,
+            "reset_failures": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+
+        with self._cond:
+            self._schedule_refill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @contextlib.contextmanager
+    def lease(self, timeout=None):
+        driver = self.acquire(timeout=timeout)
+        discard = False
+        try:
+            yield driver
+        except BaseException:
+            # the driver may be in an unknown state, so don't hand it out again
+            discard = True
+            raise
+        finally:
+            self.release(driver, discard=discard)
+
+    def acquire(self, timeout=None):
+        started_at = time.monotonic()
+        deadline = None if timeout is None else started_at + timeout
+
+        with self._cond:
+            if self._closed:
+                raise Exception("DriverPool is closed.")
+
+            hit = True
+            failures_at_start = self._launch_failures_seen
+            while True:
+                entry = self._pop_idle()
+                if entry is not None:
+                    break
+
+                hit = False
+                if (
+                    self._launch_failures_seen > failures_at_start
+                    and self._launching == 0
+                ):
+                    raise Exception(
+                        f"DriverPool could not launch a driver: {self._last_launch_error}"
+                    ) from self._last_launch_error
+                self._schedule_refill()
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(
+                        f"Timed out after {timeout}s waiting for a pooled driver."
+                    )
+                self._cond.wait(remaining)
+                if self._closed:
+                    raise Exception("DriverPool is closed.")
+
+            waited = time.monotonic() - started_at
+            self._stats["hits" if hit else "misses"] += 1
+            self._stats["leases"] += 1
+            self._stats["wait_time_total"] += waited
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+
+            self._leased[id(entry.driver)] = entry
+            return entry.driver
+
+    def release(self, driver, discard=False):
+        reset_failed = False
+        if not discard and self.reset_level is not None and not self._closed:
+            reset_failed = not reset_driver(driver, level=self.reset_level)["ok"]
+
+        with self._cond:
+            entry = self._leased.pop(id(driver), None)
+            if entry is None:
+                raise Exception("Driver was not leased from this pool.")
+
+            entry.uses += 1
+            if reset_failed:
+                self._stats["reset_failures"] += 1
+            if discard or reset_failed or self._closed or self._is_spent(entry):
+                self._retire(entry)
+            else:
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+            stats["leased"] = len(self._leased)
+            stats["launching"] = self._launching
+            stats["wait_time_avg"] = (
+                stats["wait_time_total"] / stats["leases"] if stats["leases"] else 0.0
+            )
+            return stats
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            pending_quits = dict(self._pending_quits)
+            self._cond.notify_all()
+
+        for entry in idle:
+            _quit_quietly(entry.driver)
+        # queued refills would only launch chrome to quit it again; leased
+        # drivers are quit as they are released
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for future, driver in pending_quits.items():
+            if future.cancelled():
+                _quit_quietly(driver)
+
+    # the methods below must be called with self._cond held
+
+    def _pop_idle(self):
+        while self._idle:
+            entry = self._idle.popleft()
+            if self._is_spent(entry):
+                self._retire(entry)
+                continue
+            return entry
+        return None
+
+    def _is_spent(self, entry):
+        if self.max_uses is not None and entry.uses >= self.max_uses:
+            return True
+        if (
+            self.max_age is not None
+            and time.monotonic() - entry.created_at >= self.max_age
+        ):
+            return True
+        return False
+
+    def _retire(self, entry):
+        self._stats["retired"] += 1
+        if self._closed:
+            _quit_quietly(entry.driver)
+            return
+        self._pending_quits = {
+            f: d for f, d in self._pending_quits.items() if not f.done()
+        }
+        future = self._executor.submit(_quit_quietly, entry.driver)
+        self._pending_quits[future] = entry.driver
+        self._schedule_refill()
+
+    def _schedule_refill(self):
+        if self._closed:
+            return
+        missing = self.size - (len(self._idle) + len(self._leased) + self._launching)
+        for _ in range(missing):
+            self._launching += 1
+            self._executor.submit(self._launch)
+
+    def _launch(self):
+        with self._cond:
+            if self._closed:
+                self._launching -= 1
+                return
+        try:
+            driver = get_chromedriver(**self.chromedriver_kwargs)
+        except Exception as exc:
+            logger.warning(f"DriverPool launch failed: {exc}")
+            with self._cond:
+                self._launching -= 1
+                self._stats["launch_failures"] += 1
+                self._launch_failures_seen += 1
+                self._last_launch_error = exc
+                self._cond.notify_all()
+            return
+
+        with self._cond:
+            self._launching -= 1
+            self._stats["launches"] += 1
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                self._idle.append(_PooledDriver(driver))
+                self._cond.notify()
+
+        if closed:
+            _quit_quietly(driver)
+
+
+def _quit_quietly(driver):
+    try:
+        driver.quit()
+    except Exception as exc:
+        logger.debug(f"Error quitting pooled driver: {exc}")
@@ -0,0 +1,126 @@
+import datetime
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CHARSET = "utf-8"
+
+
+def _charset(content_type):
+    for param in (content_type or "").split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "charset" and value:
+            return value.strip("\"'")
+    return None
+
+
+def _is_document_response(request, since) -> bool:
+    # an earlier navigation to the same url, or a 304 whose body is only in the
+    # browser cache, says nothing about this one
+    return (
+        request.response is not None
+        and request.response.status_code != 304
+        and request.date >= since
+    )
+
+
+def _find_document_request(driver, urls, since):
+    if capture := getattr(driver, "capture", None):
+        for url in urls:
+            request = capture.load_request(url)
+            if request is not None and _is_document_response(request, since):
+                return request
+        return None
+    # without the capture index, walk the store from the newest request
+    for request in reversed(driver.requests):
+        if request.date < since:
+            break
+        if request.url in urls and _is_document_response(request, since):
+            return request
+    return None
+
+
+class FetchResult:
+    """The main-document response of a navigation, as the proxy captured it.
+
+    `text` decodes the captured bytes; `dom()` serializes the live DOM over
+    WebDriver, which is slower and only done on request.
+    """
+
+    def __init__(self, driver, url, final_url, response, seconds):
+        self.driver = driver
+        self.url = url
+        self.final_url = final_url
+        self.seconds = seconds
+        self.status = response.status_code if response is not None else None
+        self.reason = response.reason if response is not None else None
+        self.headers = response.headers if response is not None else {}
+        self._response = response
+        self._body = None
+        self._text = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and 200 <= self.status < 300
+
+    @property
+    def body(self) -> bytes:
+        """The response body with any content encoding removed."""
+        if self._body is None:
+            body = self._response.body if self._response is not None else b""
+            if encoding := self.headers.get("Content-Encoding"):
+                from seleniumwire.utils import decode
+
+                try:
+                    body = decode(body, encoding)
+                except ValueError as exc:
+                    logger.warning(
+                        f"Cannot decode {encoding} body of {self.url}: {exc}"
+                    )
+            self._body = body
+        return self._body
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            if not self.body:
+                # nothing captured, e.g. a CapturePolicy dropped the body
+                self._text = self.dom()
+            else:
+                charset = _charset(self.headers.get("Content-Type"))
+                try:
+                    self._text = self.body.decode(charset or DEFAULT_CHARSET, "replace")
+                except LookupError:
+                    self._text = self.body.decode(DEFAULT_CHARSET, "replace")
+        return self._text
+
+    def dom(self) -> str:
+        return self.driver.page_source
+
+    def __repr__(self):
+        return f"<FetchResult {self.status} {self.final_url}>"
+
+
+def fetch(driver, url) -> FetchResult:
+    """Navigate a selenium-wire `driver` to `url` and return the captured
+    main-document response instead of serializing the DOM."""
+    if not hasattr(driver, "backend"):
+        raise Exception("fetch() requires a selenium-wire driver.")
+
+    started_at = time.monotonic()
+    # selenium-wire stamps requests with the local wall clock
+    since = datetime.datetime.now()
+    driver.get(url)
+    final_url = driver.current_url
+    request = _find_document_request(driver, (final_url, url), since)
+    if request is None:
+        logger.warning(f"No captured response for {url}")
+    return FetchResult(
+        driver,
+        url,
+        final_url,
+        request.response if request is not None else None,
+        time.monotonic() - started_at,
+    )
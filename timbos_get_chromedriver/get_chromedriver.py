@@ -1,26 +1,68 @@
 import json
 import logging
 import os
-
-import selenium_stealth
-import seleniumbase
-import seleniumwire
-import seleniumwire.undetected_chromedriver as sw_uc
-import undetected_chromedriver as ufa_uc
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service as ChromeService
+import shutil
+import time
 
 from . import update_chromedriver
+from .capture import attach_capture
+from .instrumentation import NULL_METRICS
+from .process_tree import get_owner_env, get_owner_switch, install_process_tree_quit
+from .profile_template import (
+    clone_profile,
+    get_profile_template,
+    remove_profile_on_quit,
+)
+from .proxy_rotation import track_client_connections
+from .proxy_selector import attach_proxy_selector
+from .resource_blocking import ResourceBlocker
+from .stealth import DEFAULT_STEALTH_OPTIONS, apply_stealth
+from .wait_policy import WaitPolicy
+
+# the selenium backends are imported on first use only, since each of them
+# (selenium-wire's vendored mitmproxy in particular) is slow to import
 
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_ADDL_CHROME_OPTIONS_ARGS = [
+    "--check-for-update-interval=3600",
+    "--disable-auto-reload",
+    "--disable-background-networking",
+    "--disable-breakpad",
+    "--disable-component-update",
+    "--disable-crash-reporter",
+    "--disable-default-apps",
+    "--disable-extensions",
+    "--disable-features=OptimizationGuideModelDownloading,OptimizationHintsFetching,OptimizationTargetPrediction,OptimizationHints",
+    "--disable-fetching-hints-at-navigation-start",
+    "--ignore-certificate-errors",
+    "--prerender-from-omnibox=disabled",
+    "--verbose",
+    "--webview-disable-safebrowsing-support",
+]
+
+DEFAULT_CHROME_PREFS = {
+    "intl.accept_languages": "en,en_US",
+    "download.prompt_for_download": False,
+    "download.default_directory": "/tmp",
+    "automatic_downloads": 2,
+    "download_restrictions": 3,
+    "notifications": 2,
+    "media_stream": 2,
+    "media_stream_mic": 2,
+    "media_stream_camera": 2,
+    "durable_storage": 2,
+}
+
+
 def patched_uc_quit(self):
+    # whatever survives this is terminated by quit_process_tree()
     try:
         self.service.process.kill()
         logger.debug("webdriver process ended")
-    except (AttributeError, RuntimeError, OSError):
-        pass
+    except (AttributeError, RuntimeError, OSError) as exc:
+        logger.debug(f"Cannot kill webdriver process: {exc}")
     try:
         self.reactor.event.set()
         logger.debug("shutting down reactor")
@@ -30,41 +72,39 @@ def patched_uc_quit(self):
         os.kill(self.browser_pid, 15)
         logger.debug("gracefully closed browser")
     except Exception as exc:
-        pass
+        logger.debug(f"Cannot terminate browser: {exc}")
 
 
-def get_chromedriver(
+def get_backend_name(
+    *, use_sb_uc=None, use_selenium_wire_webdriver=True, use_sw_uc=True, use_ufa_uc=None
+) -> str:
+    if use_ufa_uc is True:
+        return "ufa_uc"
+    if use_sb_uc is True:
+        return "seleniumbase"
+    if use_selenium_wire_webdriver is True and use_sw_uc is True:
+        return "sw_uc"
+    return "seleniumwire"
+
+
+def build_chrome_options(
     *,
     addl_chrome_options_args=None,
-    chromedrivers_base_path=None,
     headless=True,
     incognito=True,
-    profile_path=None,  # don't use
-    proxy_string=None,
-    root_cert_path=None,
-    use_sb_uc=None,  # seleniumbase
-    use_selenium_stealth=True,
-    use_selenium_wire=True,
-    use_selenium_wire_webdriver=True,
-    use_sw_uc=True,  # seleniumwire
-    use_ufa_uc=None,  # ultrafunkamsterdam
+    profile_path=None,
+    use_sw_uc=True,
+    use_ufa_uc=None,
     user_agent=None,
     user_data_dir=None,
 ):
-    for dir in [profile_path, user_data_dir]:
-        if dir is not None:
-            if not os.path.isdir(dir):
-                raise FileNotFoundError(f"Directory {dir} does not exist")
-
-    config_path_to_chromedriver = (
-        update_chromedriver.match_chromedriver_to_chrome_browser(
-            chromedrivers_base_path=chromedrivers_base_path
-        )
-    )
-
     if use_sw_uc:
+        import seleniumwire.undetected_chromedriver as sw_uc
+
         chrome_options = sw_uc.ChromeOptions()
     else:
+        from selenium.webdriver.chrome.options import Options as ChromeOptions
+
         chrome_options = ChromeOptions()
 
     # options.preferences.default = {
@@ -90,22 +130,7 @@ def get_chromedriver(
 
     ## default additional chrome_options arguments
     if addl_chrome_options_args is None:
-        addl_chrome_options_args = [
-            "--check-for-update-interval=3600",
-            "--disable-auto-reload",
-            "--disable-background-networking",
-            "--disable-breakpad",
-            "--disable-component-update",
-            "--disable-crash-reporter",
-            "--disable-default-apps",
-            "--disable-extensions",
-            "--disable-features=OptimizationGuideModelDownloading,OptimizationHintsFetching,OptimizationTargetPrediction,OptimizationHints",
-            "--disable-fetching-hints-at-navigation-start",
-            "--ignore-certificate-errors",
-            "--prerender-from-omnibox=disabled",
-            "--verbose",
-            "--webview-disable-safebrowsing-support",
-        ]
+        addl_chrome_options_args = DEFAULT_ADDL_CHROME_OPTIONS_ARGS
     for arg in addl_chrome_options_args:
         chrome_options.add_argument(arg)
 
@@ -127,21 +152,7 @@ def get_chromedriver(
         chrome_options.add_argument(f"--profile-directory={profile_path}")
 
     if use_ufa_uc is not True:
-        chrome_options.add_experimental_option(
-            "prefs",
-            {
-                "intl.accept_languages": "en,en_US",
-                "download.prompt_for_download": False,
-                "download.default_directory": "/tmp",
-                "automatic_downloads": 2,
-                "download_restrictions": 3,
-                "notifications": 2,
-                "media_stream": 2,
-                "media_stream_mic": 2,
-                "media_stream_camera": 2,
-                "durable_storage": 2,
-            },
-        )
+        chrome_options.add_experimental_option("prefs", dict(DEFAULT_CHROME_PREFS))
 
     if use_ufa_uc is not True and use_sw_uc is not True:
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
@@ -150,15 +161,242 @@ def get_chromedriver(
     if user_agent:
         chrome_options.add_argument(f"--user-agent={user_agent}")
 
-    chrome_service = ChromeService(executable_path=config_path_to_chromedriver)
+    return chrome_options
+
+
+def get_chromedriver(
+    *,
+    addl_chrome_options_args=None,
+    block_resources=None,
+    capture=None,
+    chromedriver_path=None,
+    chromedrivers_base_path=None,
+    chromedrivers_max_bytes=None,
+    chromedrivers_max_versions=None,
+    headless=True,
+    incognito=True,
+    metrics=None,
+    profile_path=None,  # don't use
+    profile_template=None,
+    proxy_rotation=None,
+    proxy_selector=None,
+    proxy_string=None,
+    root_cert_path=None,
+    use_sb_uc=None,  # seleniumbase
+    use_selenium_stealth=True,
+    use_selenium_wire=True,
+    use_selenium_wire_webdriver=True,
+    use_sw_uc=True,  # seleniumwire
+    use_ufa_uc=None,  # ultrafunkamsterdam
+    user_agent=None,
+    user_data_dir=None,
+    wait_policy=None,
+):
+    if metrics is None:
+        metrics = NULL_METRICS
+    if wait_policy is None:
+        wait_policy = WaitPolicy.legacy()
+
+    for dir in [profile_path, user_data_dir]:
+        if dir is not None:
+            if not os.path.isdir(dir):
+                raise FileNotFoundError(f"Directory {dir} does not exist")
+
+    if proxy_selector is not None:
+        # these backends launch without the proxy, so its health can't be judged
+        if use_ufa_uc is True or (
+            use_sb_uc is not True and use_selenium_wire_webdriver is not True
+        ):
+            raise ValueError(
+                "proxy_selector requires a backend that applies proxy_string "
+                "(sw_uc, seleniumwire or seleniumbase)."
+            )
+        if proxy_string is None:
+            proxy_string = proxy_selector.choose()
+
+    backend = get_backend_name(
+        use_sb_uc=use_sb_uc,
+        use_selenium_wire_webdriver=use_selenium_wire_webdriver,
+        use_sw_uc=use_sw_uc,
+        use_ufa_uc=use_ufa_uc,
+    )
+    if proxy_rotation is not None and backend not in ("sw_uc", "seleniumwire"):
+        raise ValueError("proxy_rotation requires a selenium-wire backend.")
+
+    if capture is not None and (use_ufa_uc is True or use_sb_uc is True):
+        raise ValueError("capture requires a selenium-wire backend.")
+
+    profile_clone_dir = None
+    if profile_template:
+        if user_data_dir is not None:
+            raise Exception("Pass either profile_template or user_data_dir, not both.")
+        with metrics.span("clone_profile_template"):
+            if profile_template is True:
+                profile_template = get_profile_template()
+            if profile_template:
+                profile_clone_dir = clone_profile(profile_template)
+        user_data_dir = profile_clone_dir
+
+    with metrics.span("get_chromedriver", backend=backend):
+        if chromedriver_path:
+            config_path_to_chromedriver = chromedriver_path
+        else:
+            config_path_to_chromedriver = (
+                update_chromedriver.match_chromedriver_to_chrome_browser(
+                    chromedrivers_base_path=chromedrivers_base_path,
+                    chromedrivers_max_bytes=chromedrivers_max_bytes,
+                    chromedrivers_max_versions=chromedrivers_max_versions,
+                    metrics=metrics,
+                )
+            )
+
+        with metrics.span("build_chrome_options", backend=backend):
+            chrome_options = build_chrome_options(
+                addl_chrome_options_args=addl_chrome_options_args,
+                headless=headless,
+                incognito=incognito,
+                profile_path=profile_path,
+                use_sw_uc=use_sw_uc,
+                use_ufa_uc=use_ufa_uc,
+                user_agent=user_agent,
+                user_data_dir=user_data_dir,
+            )
+            if profile_clone_dir and incognito is True:
+                # build_chrome_options leaves the user data dir out in incognito
+                chrome_options.add_argument(f"--user-data-dir={profile_clone_dir}")
+            chrome_options.page_load_strategy = wait_policy.page_load_strategy
+            # lets the orphan reaper find this browser if the process crashes
+            chrome_options.add_argument(get_owner_switch())
+
+        # for the selenium-wire backends this includes starting the proxy, which
+        # happens inside the webdriver constructor
+        with metrics.span("launch_driver", backend=backend):
+            try:
+                driver = _launch_driver(
+                    chrome_options,
+                    config_path_to_chromedriver,
+                    capture=capture,
+                    headless=headless,
+                    incognito=incognito,
+                    proxy_string=proxy_string,
+                    root_cert_path=root_cert_path,
+                    use_sb_uc=use_sb_uc,
+                    use_selenium_wire=use_selenium_wire,
+                    use_selenium_wire_webdriver=use_selenium_wire_webdriver,
+                    use_sw_uc=use_sw_uc,
+                    use_ufa_uc=use_ufa_uc,
+                    user_agent=user_agent,
+                    user_data_dir=user_data_dir,
+                    wait_policy=wait_policy,
+                )
+            except BaseException as exc:
+                # only failures are reported: a launch doesn't exercise the
+                # proxy, so a success says nothing about its health
+                if proxy_selector is not None and isinstance(exc, Exception):
+                    proxy_selector.report(proxy_string, False)
+                if profile_clone_dir:
+                    shutil.rmtree(profile_clone_dir, ignore_errors=True)
+                raise
+
+        # chrome is running from here on, so a failed setup step must not
+        # leave it, chromedriver or the profile clone behind
+        try:
+            if use_ufa_uc is True or use_sw_uc is True:
+                # monkey patch uc's quit()
+                install_process_tree_quit(
+                    driver, graceful_quit=lambda: patched_uc_quit(driver)
+                )
+            else:
+                install_process_tree_quit(driver)
+
+            if profile_clone_dir:
+                remove_profile_on_quit(driver, profile_clone_dir)
+
+            if block_resources:
+                with metrics.span("block_resources", backend=backend):
+                    blocker = ResourceBlocker.from_option(
+                        block_resources, metrics=metrics
+                    )
+                    blocker.attach(
+                        driver, use_selenium_wire=backend in ("sw_uc", "seleniumwire")
+                    )
+
+            if backend in ("sw_uc", "seleniumwire"):
+                # so that set_proxy() can later close connections opened before it
+                track_client_connections(driver)
+                driver.proxy_string = proxy_string
+                if proxy_selector is not None:
+                    # inside the rotation wrapper, so it sees the proxy in use
+                    attach_proxy_selector(driver, proxy_selector)
+                if proxy_rotation is not None:
+                    proxy_rotation.attach(driver)
+            elif proxy_selector is not None:
+                driver.proxy_string = proxy_string
+                attach_proxy_selector(driver, proxy_selector)
+
+            if use_selenium_stealth is True:
+                with metrics.span("selenium_stealth", backend=backend):
+                    apply_stealth(
+                        driver, user_agent=user_agent, **DEFAULT_STEALTH_OPTIONS
+                    )
+
+            with metrics.span("set_timeouts", backend=backend):
+                wait_policy.apply(driver)
+        except BaseException:
+            try:
+                driver.quit()
+            except Exception as exc:
+                logger.warning(f"Cannot quit driver after a failed setup: {exc}")
+            if profile_clone_dir:
+                shutil.rmtree(profile_clone_dir, ignore_errors=True)
+            raise
+
+    return driver
+
+
+def _launch_driver(
+    chrome_options,
+    config_path_to_chromedriver,
+    *,
+    capture,
+    headless,
+    incognito,
+    proxy_string,
+    root_cert_path,
+    use_sb_uc,
+    use_selenium_wire,
+    use_selenium_wire_webdriver,
+    use_sw_uc,
+    use_ufa_uc,
+    user_agent,
+    user_data_dir,
+    wait_policy,
+):
+    from selenium.webdriver.chrome.service import Service as ChromeService
+
+    # in its own session, so the browser it starts can be killed as one group
+    try:
+        chrome_service = ChromeService(
+            executable_path=config_path_to_chromedriver,
+            env=get_owner_env(),
+            popen_kw={"start_new_session": True} if os.name == "posix" else {},
+        )
+    except TypeError:  # selenium before 4.11
+        chrome_service = ChromeService(
+            executable_path=config_path_to_chromedriver, env=get_owner_env()
+        )
 
     try:
         if use_ufa_uc is True:
+            import undetected_chromedriver as ufa_uc
+
             driver = ufa_uc.Chrome(
                 options=chrome_options, service=chrome_service, use_subprocess=True
             )
 
         elif use_sb_uc is True:
+            import seleniumbase
+
             driver = seleniumbase.Driver(
                 undetectable=True,
                 headless2=headless,
@@ -167,13 +405,18 @@ def get_chromedriver(
                 user_data_dir=user_data_dir,
                 incognito=incognito,
                 use_wire=use_selenium_wire,
+                page_load_strategy=wait_policy.page_load_strategy,
             )
 
         elif use_selenium_wire_webdriver is True:
             # TODO: be able to provide cookies
             if use_sw_uc is True:
+                import seleniumwire.undetected_chromedriver as sw_uc
+
                 which_driver = sw_uc.Chrome
             else:
+                import seleniumwire.webdriver
+
                 which_driver = seleniumwire.webdriver.Chrome
 
             chrome_options.headless = None
@@ -190,6 +433,8 @@ def get_chromedriver(
                     "https": proxy_string,
                     "no_proxy": "localhost",
                 }
+            if capture is not None:
+                seleniumwire_options.update(capture.seleniumwire_options())
 
             driver = which_driver(
                 options=chrome_options,
@@ -197,31 +442,97 @@ def get_chromedriver(
                 seleniumwire_options=seleniumwire_options,
             )
         else:
+            import seleniumwire.webdriver
+
             driver = seleniumwire.webdriver.Chrome(
-                options=chrome_options, service=chrome_service
+                options=chrome_options,
+                service=chrome_service,
+                seleniumwire_options=(
+                    capture.seleniumwire_options() if capture is not None else {}
+                ),
             )
 
+        if capture is not None:
+            attach_capture(driver, capture)
+
     except Exception as exc:
         logger.warning(str(exc))
         raise
 
-    if use_ufa_uc is True or use_sw_uc is True:
-        # monkey patch uc's quit()
-        driver.quit = lambda: patched_uc_quit(driver)
-
-    if use_selenium_stealth is True:
-        selenium_stealth.stealth(
-            driver,
-            languages=["en-US", "en"],
-            vendor="Google Inc.",
-            platform="Win32",
-            webgl_vendor="Intel Inc.",
-            renderer="Intel Iris OpenGL Engine",
-            fix_hairline=True,
+    return driver
+
+
+def _timed_launch(index, chromedriver_kwargs):
+    started_at = time.monotonic()
+    try:
+        driver = get_chromedriver(**chromedriver_kwargs)
+    except Exception as exc:
+        return index, None, exc, time.monotonic() - started_at
+    return index, driver, None, time.monotonic() - started_at
+
+
+def get_chromedrivers(n, *, max_workers=None, **chromedriver_kwargs):
+    started_at = time.monotonic()
+
+    # checked before resolving, so bad input never reaches the network
+    if n < 0:
+        raise Exception(f"Cannot launch {n} drivers.")
+    result = {
+        "drivers": [],
+        "errors": [],
+        "launches": [],
+        "resolve_seconds": 0.0,
+        "total_seconds": None,
+    }
+    if n == 0:
+        result["total_seconds"] = time.monotonic() - started_at
+        return result
+
+    # resolve the chromedriver once instead of once per launch
+    if not chromedriver_kwargs.get("chromedriver_path"):
+        chromedriver_kwargs["chromedriver_path"] = (
+            update_chromedriver.match_chromedriver_to_chrome_browser(
+                chromedrivers_base_path=chromedriver_kwargs.get(
+                    "chromedrivers_base_path"
+                ),
+                chromedrivers_max_bytes=chromedriver_kwargs.get(
+                    "chromedrivers_max_bytes"
+                ),
+                chromedrivers_max_versions=chromedriver_kwargs.get(
+                    "chromedrivers_max_versions"
+                ),
+                metrics=chromedriver_kwargs.get("metrics"),
+            )
         )
+    result["resolve_seconds"] = time.monotonic() - started_at
 
-    implicit_wait_time = 180
-    driver.set_page_load_timeout(implicit_wait_time)
-    driver.implicitly_wait(implicit_wait_time)
+    if max_workers is None:
+        max_workers = min(n, 2 * (os.cpu_count() or 1))
 
-    return driver
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="tgc-launch"
+    ) as executor:
+        futures = [
+            executor.submit(_timed_launch, i, chromedriver_kwargs) for i in range(n)
+        ]
+        for future in as_completed(futures):
+            index, driver, exc, seconds = future.result()
+            result["launches"].append(
+                {"index": index, "ok": exc is None, "seconds": seconds}
+            )
+            if exc is None:
+                result["drivers"].append(driver)
+            else:
+                logger.warning(f"Launch {index} of {n} failed: {exc}")
+                result["errors"].append(
+                    {"index": index, "exception": exc, "seconds": seconds}
+                )
+
+    result["launches"].sort(key=lambda launch: launch["index"])
+    result["total_seconds"] = time.monotonic() - started_at
+    logger.info(
+        f"Launched {len(result['drivers'])} of {n} drivers in {result['total_seconds']:.2f}s ({len(result['errors'])} failed)"
+    )
+    return result
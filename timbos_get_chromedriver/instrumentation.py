@@ -0,0 +1,236 @@
+import logging
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_tag(self, key, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullMetrics:
+    """The default metrics sink: every hook is a no-op returning a shared span."""
+
+    def span(self, name, **tags):
+        return _NULL_SPAN
+
+    def increment(self, name, value=1, **tags):
+        pass
+
+    def observe(self, name, value, **tags):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class Span:
+    __slots__ = ("metrics", "name", "tags", "started_at")
+
+    def __init__(self, metrics, name, tags):
+        self.metrics = metrics
+        self.name = name
+        self.tags = tags
+        self.started_at = None
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        self.metrics.on_span_start(self.name, self.tags)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started_at
+        self.metrics.on_span_end(self.name, self.tags, seconds, exc)
+        return False
+
+    def set_tag(self, key, value):
+        self.tags[key] = value
+
+
+class Metrics(NullMetrics):
+    """Base class for real sinks: override the on_* hooks you need."""
+
+    def span(self, name, **tags):
+        return Span(self, name, tags)
+
+    def increment(self, name, value=1, **tags):
+        self.on_increment(name, value, tags)
+
+    def observe(self, name, value, **tags):
+        self.on_observe(name, value, tags)
+
+    def on_span_start(self, name, tags):
+        pass
+
+    def on_span_end(self, name, tags, seconds, exc):
+        pass
+
+    def on_increment(self, name, value, tags):
+        pass
+
+    def on_observe(self, name, value, tags):
+        pass
+
+
+class CallbackMetrics(Metrics):
+    def __init__(self, on_start=None, on_end=None, on_increment=None, on_observe=None):
+        self._on_start = on_start
+        self._on_end = on_end
+        self._on_increment = on_increment
+        self._on_observe = on_observe
+
+    def on_span_start(self, name, tags):
+        if self._on_start:
+            self._on_start(name, dict(tags))
+
+    def on_span_end(self, name, tags, seconds, exc):
+        if self._on_end:
+            self._on_end(name, dict(tags), seconds, exc)
+
+    def on_increment(self, name, value, tags):
+        if self._on_increment:
+            self._on_increment(name, value, dict(tags))
+
+    def on_observe(self, name, value, tags):
+        if self._on_observe:
+            self._on_observe(name, value, dict(tags))
+
+
+def _label_key(name, tags):
+    return name, tuple(sorted((k, str(v)) for k, v in tags.items()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class PrometheusTextMetrics(Metrics):
+    """Aggregates spans, counters and observations in memory and renders them in
+    the Prometheus text exposition format."""
+
+    def __init__(self, prefix="tgc"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._spans = {}  # (name, labels) -> [count, sum, max, errors]
+        self._counters = {}  # (name, labels) -> total
+        self._observations = {}  # (name, labels) -> [count, sum, max]
+
+    def on_span_end(self, name, tags, seconds, exc):
+        key = _label_key(name, tags)
+        with self._lock:
+            stats = self._spans.setdefault(key, [0, 0.0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] += int(exc is not None)
+
+    def on_increment(self, name, value, tags):
+        key = _label_key(name, tags)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def on_observe(self, name, value, tags):
+        key = _label_key(name, tags)
+        with self._lock:
+            stats = self._observations.setdefault(key, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += value
+            stats[2] = max(stats[2], value)
+
+    def render(self) -> str:
+        p = self.prefix
+        lines = []
+        with self._lock:
+            if self._spans:
+                lines.append(f"# TYPE {p}_phase_seconds summary")
+                for (name, labels), (count, total, _, _) in sorted(self._spans.items()):
+                    label_str = _format_labels((("phase", name),) + labels)
+                    lines.append(f"{p}_phase_seconds_count{label_str} {count}")
+                    lines.append(f"{p}_phase_seconds_sum{label_str} {total:.6f}")
+                lines.append(f"# TYPE {p}_phase_seconds_max gauge")
+                for (name, labels), (_, _, maximum, _) in sorted(self._spans.items()):
+                    label_str = _format_labels((("phase", name),) + labels)
+                    lines.append(f"{p}_phase_seconds_max{label_str} {maximum:.6f}")
+                lines.append(f"# TYPE {p}_phase_errors_total counter")
+                for (name, labels), (_, _, _, errors) in sorted(self._spans.items()):
+                    label_str = _format_labels((("phase", name),) + labels)
+                    lines.append(f"{p}_phase_errors_total{label_str} {errors}")
+
+            typed = set()
+            for (name, labels), total in sorted(self._counters.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {p}_{name}_total counter")
+                lines.append(f"{p}_{name}_total{_format_labels(labels)} {total}")
+
+            for (name, labels), (count, total, maximum) in sorted(
+                self._observations.items()
+            ):
+                label_str = _format_labels(labels)
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {p}_{name} summary")
+                lines.append(f"{p}_{name}_count{label_str} {count}")
+                lines.append(f"{p}_{name}_sum{label_str} {total:.6f}")
+
+        return "\n".join(lines) + "\n"
+
+
+class StatsdMetrics(Metrics):
+    """Emits one StatsD line per event, with DogStatsD-style tags, over UDP or to
+    a `send` callable."""
+
+    def __init__(self, host="127.0.0.1", port=8125, prefix="tgc", send=None):
+        self.prefix = prefix
+        self._address = (host, port)
+        self._send = send
+        self._socket = None
+        if send is None:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _emit(self, line):
+        try:
+            if self._send is not None:
+                self._send(line)
+            else:
+                self._socket.sendto(line.encode("utf-8"), self._address)
+        except Exception as exc:
+            logger.debug(f"Cannot send metric {line!r}: {exc}")
+
+    @staticmethod
+    def _format_tags(tags):
+        if not tags:
+            return ""
+        return "|#" + ",".join(f"{k}:{v}" for k, v in sorted(tags.items()))
+
+    def on_span_end(self, name, tags, seconds, exc):
+        tags = dict(tags, error=exc is not None) if exc is not None else tags
+        self._emit(
+            f"{self.prefix}.phase.{name}:{seconds * 1000:.3f}|ms{self._format_tags(tags)}"
+        )
+
+    def on_increment(self, name, value, tags):
+        self._emit(f"{self.prefix}.{name}:{value}|c{self._format_tags(tags)}")
+
+    def on_observe(self, name, value, tags):
+        self._emit(f"{self.prefix}.{name}:{value}|h{self._format_tags(tags)}")
@@ -0,0 +1,195 @@
+import collections
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_FETCH_CONCURRENCY = 4
+DEFAULT_TAB_TIMEOUT = 60
+POLL_INTERVAL_SECONDS = 0.05
+
+# evaluated in the tab over CDP, which unlike execute_script doesn't wait for
+# the tab's pending load; responseStatus needs chrome 109+
+COLLECT_EXPRESSION = """
+(() => {
+    const nav = performance.getEntriesByType("navigation")[0];
+    return {
+        html: document.documentElement ? document.documentElement.outerHTML : "",
+        final_url: location.href,
+        status: nav && nav.responseStatus ? nav.responseStatus : null,
+        load_seconds: nav && nav.duration ? nav.duration / 1000 : null,
+    };
+})()
+"""
+
+
+def _evaluate(driver, expression):
+    response = driver.execute_cdp_cmd(
+        "Runtime.evaluate", {"expression": expression, "returnByValue": True}
+    )
+    if details := response.get("exceptionDetails"):
+        raise Exception(f"Cannot evaluate in tab: {details.get('text')}")
+    return response["result"].get("value")
+
+
+def _open_tab(driver, url) -> str:
+    # a CDP target loads without the blocking wait that driver.get() does, so
+    # k tabs load side by side; it starts blank so the stealth setup is in
+    # place before the first document
+    handle = driver.execute_cdp_cmd(
+        "Target.createTarget", {"url": "about:blank", "background": True}
+    )["targetId"]
+    driver.switch_to.window(handle)
+    if stealth_setup := getattr(driver, "stealth_setup", None):
+        driver.execute_cdp_cmd(
+            "Page.addScriptToEvaluateOnNewDocument",
+            {"source": stealth_setup["script"]},
+        )
+        driver.execute_cdp_cmd(
+            "Network.setUserAgentOverride", stealth_setup["user_agent_override"]
+        )
+    # the selenium-wire interceptor covers every tab already
+    blocker = getattr(driver, "resource_blocker", None)
+    if blocker is not None and blocker.mode == "cdp":
+        blocker.apply_cdp(driver)
+    driver.execute_cdp_cmd("Page.navigate", {"url": url})
+    return handle
+
+
+def _close_tab(driver, handle) -> None:
+    try:
+        driver.execute_cdp_cmd("Target.closeTarget", {"targetId": handle})
+    except Exception as exc:
+        logger.debug(f"Cannot close tab {handle}: {exc}")
+
+
+def _new_result(index, url) -> dict:
+    return {
+        "index": index,
+        "url": url,
+        "final_url": None,
+        "status": None,
+        "html": None,
+        "seconds": None,
+        "load_seconds": None,
+        "error": None,
+    }
+
+
+# the blank page a tab starts from counts as not loaded yet
+LOADED_EXPRESSION = (
+    'document.readyState === "complete" && location.href !== "about:blank"'
+)
+
+
+def _is_loaded(driver, handle) -> bool:
+    driver.switch_to.window(handle)
+    return _evaluate(driver, LOADED_EXPRESSION) is True
+
+
+def _collect(driver, index, url, handle, started_at, error=None) -> dict:
+    result = _new_result(index, url)
+    result["error"] = error
+    try:
+        driver.switch_to.window(handle)
+        result.update(_evaluate(driver, COLLECT_EXPRESSION))
+        if result["status"] is None:
+            if capture := getattr(driver, "capture", None):
+                result["status"] = capture.status(url)
+    except Exception as exc:
+        result["error"] = exc
+    result["seconds"] = time.monotonic() - started_at
+    return result
+
+
+def _report_to_proxy_selector(driver, result) -> None:
+    # as attach_proxy_selector() does for driver.get()
+    if (proxy_selector := getattr(driver, "proxy_selector", None)) is None:
+        return
+    proxy_string = getattr(driver, "proxy_string", None)
+    if result["error"] is not None:
+        proxy_selector.report(proxy_string, False)
+    else:
+        ok = result["status"] is None or result["status"] < 500
+        proxy_selector.report(
+            proxy_string, ok, result["load_seconds"] or result["seconds"]
+        )
+
+
+def fetch_many(
+    driver,
+    urls,
+    concurrency=DEFAULT_FETCH_CONCURRENCY,
+    tab_timeout=DEFAULT_TAB_TIMEOUT,
+):
+    """Fetch `urls` through up to `concurrency` tabs of one browser at a time.
+
+    Yields one dict per url (index, url, final_url, status, html, seconds,
+    load_seconds, error) as its tab finishes loading, whichever that is, and
+    opens the next url in a fresh tab as each one is closed. A tab still
+    loading after `tab_timeout` seconds is collected as it is, with a
+    TimeoutError. Tabs share the browser's cookies and cache; the stealth
+    setup and CDP resource blocking of get_chromedriver() are repeated in each
+    tab before it navigates, and each outcome is reported to the driver's
+    proxy selector. Tabs navigate over CDP rather than driver.get(), so a
+    ProxyRotation per="navigation" doesn't count them and a WaitPolicy's
+    network_idle wait doesn't apply. The driver's original window is left
+    selected afterwards.
+    """
+    if concurrency < 1:
+        raise Exception(f"Concurrency must be at least 1, not {concurrency}.")
+
+    original_handle = driver.current_window_handle
+    pending = collections.deque(enumerate(urls))
+    active = []
+    try:
+        while pending or active:
+            while pending and len(active) < concurrency:
+                index, url = pending.popleft()
+                started_at = time.monotonic()
+                try:
+                    handle = _open_tab(driver, url)
+                except Exception as exc:
+                    result = _new_result(index, url)
+                    result["error"] = exc
+                    result["seconds"] = time.monotonic() - started_at
+                    _report_to_proxy_selector(driver, result)
+                    yield result
+                    continue
+                active.append((index, url, handle, started_at))
+
+            done = None
+            for tab in active:
+                index, url, handle, started_at = tab
+                try:
+                    if _is_loaded(driver, handle):
+                        done = tab, None
+                        break
+                except Exception as exc:
+                    done = tab, exc
+                    break
+                if time.monotonic() - started_at >= tab_timeout:
+                    done = tab, TimeoutError(
+                        f"{url} still loading after {tab_timeout}s"
+                    )
+                    break
+
+            if done is None:
+                if active:
+                    time.sleep(POLL_INTERVAL_SECONDS)
+                continue
+            tab, error = done
+            active.remove(tab)
+            index, url, handle, started_at = tab
+            result = _collect(driver, index, url, handle, started_at, error)
+            _close_tab(driver, handle)
+            _report_to_proxy_selector(driver, result)
+            yield result
+    finally:
+        for _, _, handle, _ in active:
+            _close_tab(driver, handle)
+        try:
+            driver.switch_to.window(original_handle)
+        except Exception as exc:
+            logger.debug(f"Cannot switch back to the original window: {exc}")
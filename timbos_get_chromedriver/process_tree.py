@@ -0,0 +1,343 @@
+import logging
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# chromedriver and the browser it starts carry this in their environment, so
+# processes left behind by a crashed worker can be traced back to it
+OWNER_ENV_VAR = "TGC_OWNER"
+# the uc backends start chrome themselves, outside chromedriver's environment,
+# so the browser also carries the token as a switch chrome ignores
+OWNER_SWITCH = "--tgc-owner"
+TERMINATE_GRACE_SECONDS = 5
+KILL_GRACE_SECONDS = 2
+POLL_INTERVAL_SECONDS = 0.05
+DEFAULT_REAP_INTERVAL_SECONDS = 60
+
+# executable names the reaper is allowed to kill
+REAPABLE_PROCESS_NAMES = (
+    "chrome",
+    "chrome_crashpad",
+    "chrome_crashpad_handler",
+    "chromedriver",
+    "google-chrome",
+    "google-chrome-stable",
+)
+
+reaper_stats = {"runs": 0, "reaped": 0}
+_reaper_stats_lock = threading.Lock()
+_reaper_thread = None
+_reaper_stop = threading.Event()
+
+
+def _read_proc(pid, name) -> bytes:
+    with open(f"/proc/{pid}/{name}", "rb") as fh:
+        return fh.read()
+
+
+def _get_start_time(pid):
+    """The process start time in clock ticks since boot, or None if gone."""
+    try:
+        stat = _read_proc(pid, "stat").decode()
+    except OSError:
+        return None
+    # the command name may contain spaces and parens, so split after the last ")"
+    return int(stat[stat.rindex(")") + 2 :].split()[19])
+
+
+def _get_ppid(pid):
+    try:
+        stat = _read_proc(pid, "stat").decode()
+    except OSError:
+        return None
+    return int(stat[stat.rindex(")") + 2 :].split()[1])
+
+
+def _list_pids() -> list:
+    return [int(entry) for entry in os.listdir("/proc") if entry.isdigit()]
+
+
+def get_owner_token(pid=None) -> str:
+    """Identify a process by pid and start time, so pid reuse is not mistaken
+    for the owner still being alive."""
+    pid = os.getpid() if pid is None else pid
+    if sys.platform.startswith("linux"):
+        return f"{pid}:{_get_start_time(pid)}"
+    return str(pid)
+
+
+def get_owner_env() -> dict:
+    """An environment for a chromedriver service that marks it, and the
+    browser it starts, as owned by this process."""
+    return {**os.environ, OWNER_ENV_VAR: get_owner_token()}
+
+
+def get_owner_switch() -> str:
+    return f"{OWNER_SWITCH}={get_owner_token()}"
+
+
+def owner_alive(token) -> bool:
+    pid, _, start_time = token.partition(":")
+    try:
+        pid = int(pid)
+    except ValueError:
+        return True
+    if sys.platform.startswith("linux"):
+        return str(_get_start_time(pid)) == start_time
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def get_descendants(root_pids) -> list:
+    """All live descendants of `root_pids` (linux only), parents first."""
+    if not sys.platform.startswith("linux"):
+        return []
+    children = {}
+    for pid in _list_pids():
+        if (ppid := _get_ppid(pid)) is not None:
+            children.setdefault(ppid, []).append(pid)
+    found = []
+    stack = list(root_pids)
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def _alive(pid) -> bool:
+    if sys.platform.startswith("linux"):
+        try:
+            # a zombie is already dead, it only needs reaping
+            stat = _read_proc(pid, "stat").decode()
+        except OSError:
+            return False
+        return stat[stat.rindex(")") + 2] != "Z"
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def _signal_all(pids, sig, process_groups=()) -> None:
+    for pgid in process_groups:
+        try:
+            os.killpg(pgid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+    for pid in pids:
+        try:
+            os.kill(pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+def _reap_children(pids) -> None:
+    for pid in pids:
+        try:
+            os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            # not our child; its own parent or init reaps it
+            pass
+        except OSError:
+            pass
+
+
+def _wait_gone(pids, timeout) -> list:
+    deadline = time.monotonic() + timeout
+    while True:
+        _reap_children(pids)
+        pids = [pid for pid in pids if _alive(pid)]
+        if not pids or time.monotonic() >= deadline:
+            return pids
+        time.sleep(POLL_INTERVAL_SECONDS)
+
+
+def terminate_process_tree(
+    pids, timeout=TERMINATE_GRACE_SECONDS, process_groups=()
+) -> list:
+    """Send TERM to `pids` and `process_groups`, escalate to KILL after
+    `timeout` seconds, and reap any that are our children. Returns the pids
+    still alive afterwards."""
+    pids = [pid for pid in dict.fromkeys(pids) if pid and pid != os.getpid()]
+
+    if sys.platform.startswith("win32"):
+        for pid in pids:
+            subprocess.run(
+                ["taskkill", "/PID", str(pid), "/T", "/F"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        return []
+
+    process_groups = [g for g in process_groups if g != os.getpgrp()]
+    if not pids and not process_groups:
+        return []
+
+    _signal_all(pids, signal.SIGTERM, process_groups)
+    if survivors := _wait_gone(pids, timeout):
+        logger.debug(f"Killing {len(survivors)} processes that ignored SIGTERM")
+        _signal_all(survivors, signal.SIGKILL, process_groups)
+        survivors = _wait_gone(survivors, KILL_GRACE_SECONDS)
+    if survivors:
+        logger.warning(f"Processes {survivors} survived SIGKILL")
+    return survivors
+
+
+def get_driver_root_pids(driver) -> list:
+    roots = []
+    try:
+        roots.append(driver.service.process.pid)
+    except AttributeError:
+        pass
+    if browser_pid := getattr(driver, "browser_pid", None):
+        roots.append(browser_pid)
+    return roots
+
+
+def quit_process_tree(
+    driver, graceful_quit, timeout=TERMINATE_GRACE_SECONDS, root_start_times=None
+):
+    """Quit `driver` with `graceful_quit`, then terminate whatever is left of
+    the chromedriver and browser process trees. Only the first call does
+    anything: later ones would signal pids that may have been reused since.
+
+    `root_start_times` maps the root pids to their start times as recorded at
+    launch; a root whose start time no longer matches is left alone.
+    """
+    if getattr(driver, "process_tree_quit_done", False):
+        return
+    driver.process_tree_quit_done = True
+
+    if root_start_times is None:
+        root_start_times = get_root_start_times(driver)
+    roots = [
+        pid
+        for pid, start_time in root_start_times.items()
+        if _get_start_time(pid) == start_time
+    ]
+    # collected up front: once a parent exits, its children are reparented and
+    # can no longer be found from it
+    pids = roots + get_descendants(roots)
+    start_times = {pid: _get_start_time(pid) for pid in pids}
+    # chromedriver is launched as a session leader, so its group covers the tree
+    process_groups = []
+    if hasattr(os, "getpgid"):
+        for pid in roots:
+            try:
+                if os.getpgid(pid) == pid:
+                    process_groups.append(pid)
+            except OSError:
+                pass
+
+    try:
+        graceful_quit()
+    except Exception as exc:
+        logger.debug(f"Graceful quit failed, terminating the process tree: {exc}")
+
+    # skip pids that were reused by unrelated processes in the meantime
+    pids = [pid for pid in pids if _get_start_time(pid) == start_times[pid]]
+    terminate_process_tree(pids, timeout=timeout, process_groups=process_groups)
+
+
+def get_root_start_times(driver) -> dict:
+    return {pid: _get_start_time(pid) for pid in get_driver_root_pids(driver)}
+
+
+def install_process_tree_quit(driver, graceful_quit=None) -> None:
+    graceful_quit = graceful_quit or driver.quit
+    # recorded now, while the pids are certainly this driver's
+    root_start_times = get_root_start_times(driver)
+    driver.quit = lambda: quit_process_tree(
+        driver, graceful_quit, root_start_times=root_start_times
+    )
+
+
+def find_orphans() -> list:
+    """Chrome and chromedriver processes launched by this library whose owning
+    process has exited (linux only)."""
+    if not sys.platform.startswith("linux"):
+        return []
+    markers = (f"{OWNER_ENV_VAR}=".encode(), f"{OWNER_SWITCH}=".encode())
+    orphans = []
+    owners_alive = {}
+    for pid in _list_pids():
+        try:
+            name = _read_proc(pid, "comm").decode().strip()
+            if name not in REAPABLE_PROCESS_NAMES:
+                continue
+            entries = _read_proc(pid, "environ").split(b"\0")
+            entries += _read_proc(pid, "cmdline").split(b"\0")
+        except OSError:
+            continue
+        token = _find_owner_token(entries, markers)
+        if token is None:
+            continue
+        if token not in owners_alive:
+            owners_alive[token] = owner_alive(token)
+        if not owners_alive[token]:
+            orphans.append(pid)
+    return orphans
+
+
+def _find_owner_token(entries, markers):
+    for entry in entries:
+        for marker in markers:
+            if entry.startswith(marker):
+                return entry[len(marker) :].decode(errors="replace")
+    return None
+
+
+def reap_orphans(timeout=TERMINATE_GRACE_SECONDS) -> int:
+    orphans = find_orphans()
+    if orphans:
+        logger.info(f"Reaping {len(orphans)} orphaned chrome/chromedriver processes")
+        terminate_process_tree(orphans, timeout=timeout)
+    with _reaper_stats_lock:
+        reaper_stats["runs"] += 1
+        reaper_stats["reaped"] += len(orphans)
+    return len(orphans)
+
+
+def _reaper_loop(interval) -> None:
+    while not _reaper_stop.wait(interval):
+        try:
+            reap_orphans()
+        except Exception as exc:
+            logger.warning(f"Orphan reaper failed: {exc}")
+
+
+def start_orphan_reaper(interval=DEFAULT_REAP_INTERVAL_SECONDS) -> None:
+    """Reap orphans now and then every `interval` seconds in a daemon thread."""
+    global _reaper_thread
+    if _reaper_thread is not None and _reaper_thread.is_alive():
+        return
+    reap_orphans()
+    _reaper_stop.clear()
+    _reaper_thread = threading.Thread(
+        target=_reaper_loop, args=(interval,), name="tgc-reaper", daemon=True
+    )
+    _reaper_thread.start()
+
+
+def stop_orphan_reaper() -> None:
+    _reaper_stop.set()
+
+
+def get_reaper_stats() -> dict:
+    with _reaper_stats_lock:
+        return dict(reaper_stats)
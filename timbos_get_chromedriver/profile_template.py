@@ -0,0 +1,296 @@
+import errno
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from .process_tree import get_owner_token, owner_alive
+from .update_chromedriver import chromedriver_store, resolution_cache, store_lock
+from .update_chromedriver.update_chromedriver import (
+    get_chrome_browser_version,
+    get_platform,
+    platform_to,
+)
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+PROFILE_TEMPLATES_DIRNAME = "profile-templates"
+PROFILE_TEMPLATE_LOCK_FILENAME = "profile_template.lock"
+PROFILE_TEMPLATE_BUILD_TIMEOUT_SECONDS = 60
+CLONES_DIRNAME = ".clones"
+# written into each clone, naming the process that owns it
+CLONE_OWNER_FILENAME = ".tgc-owner"
+# clones made before owner files existed are removed once this old
+UNOWNED_CLONE_MAX_AGE_SECONDS = 24 * 60 * 60
+
+# linux FICLONE ioctl: a copy-on-write clone on btrfs, xfs and similar
+FICLONE = 0x40049409
+REFLINK_UNSUPPORTED_ERRNOS = (
+    errno.EINVAL,
+    errno.ENOTTY,
+    errno.EOPNOTSUPP,
+    errno.EXDEV,
+)
+
+# files chrome leaves behind that must not be shared between instances
+PROFILE_LOCK_FILENAMES = ["SingletonCookie", "SingletonLock", "SingletonSocket"]
+
+# browser fingerprint key -> version, so `chrome --version` runs once per binary
+_browser_versions = {}
+_browser_versions_lock = threading.Lock()
+
+
+def get_default_profile_templates_path() -> str:
+    return os.path.join(
+        os.path.dirname(chromedriver_store.get_default_chromedrivers_base_path()),
+        PROFILE_TEMPLATES_DIRNAME,
+    )
+
+
+def _nest_prefs(prefs: dict) -> dict:
+    """Turn chrome's dotted pref names into the nested Preferences layout."""
+    nested = {}
+    for dotted, value in prefs.items():
+        node = nested
+        *parents, leaf = dotted.split(".")
+        for key in parents:
+            node = node.setdefault(key, {})
+        node[leaf] = value
+    return nested
+
+
+def _merge(into: dict, update: dict) -> None:
+    for key, value in update.items():
+        if isinstance(value, dict) and isinstance(into.get(key), dict):
+            _merge(into[key], value)
+        else:
+            into[key] = value
+
+
+def _write_prefs(user_data_dir: str, prefs: dict) -> None:
+    prefs_path = os.path.join(user_data_dir, "Default", "Preferences")
+    os.makedirs(os.path.dirname(prefs_path), exist_ok=True)
+    try:
+        with open(prefs_path, encoding="utf-8") as fh:
+            existing = json.load(fh)
+    except (OSError, ValueError):
+        existing = {}
+    _merge(existing, _nest_prefs(prefs))
+    with open(prefs_path, "w", encoding="utf-8") as fh:
+        json.dump(existing, fh)
+
+
+def _initialize_profile(user_data_dir: str, platform: str) -> None:
+    # a headless run to a blank page creates the databases and component state,
+    # then exits by itself
+    cmd = [
+        platform_to["chrome_browser_executable"][platform],
+        "--headless=new",
+        "--disable-gpu",
+        "--no-first-run",
+        "--no-default-browser-check",
+        f"--user-data-dir={user_data_dir}",
+        "--dump-dom",
+        "about:blank",
+    ]
+    subprocess.run(
+        cmd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        timeout=PROFILE_TEMPLATE_BUILD_TIMEOUT_SECONDS,
+        check=False,
+    )
+    # mark first run as done so clones skip the first-run flow
+    open(os.path.join(user_data_dir, "First Run"), "a").close()
+    for filename in PROFILE_LOCK_FILENAMES:
+        try:
+            os.remove(os.path.join(user_data_dir, filename))
+        except OSError:
+            pass
+
+
+def _get_browser_version(platform):
+    fingerprint = resolution_cache.get_chrome_browser_fingerprint(
+        platform_to["chrome_browser_executable"][platform]
+    )
+    key = resolution_cache._fingerprint_key(fingerprint) if fingerprint else None
+    if key is not None:
+        with _browser_versions_lock:
+            if key in _browser_versions:
+                return _browser_versions[key]
+
+    try:
+        version = get_chrome_browser_version(platform=platform)
+    except Exception as exc:
+        logger.debug(f"Cannot get the chrome browser version: {exc}")
+        version = None
+
+    if key is not None and version is not None:
+        with _browser_versions_lock:
+            _browser_versions[key] = version
+    return version
+
+
+def get_profile_template_name(version, prefs) -> str:
+    # a template is only reused for the prefs it was built with
+    prefs_hash = hashlib.sha1(
+        json.dumps(prefs, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return f"{version}-{prefs_hash[:12]}"
+
+
+def get_profile_template(prefs=None, profile_templates_path=None):
+    """Path to a warmed user-data-dir for the chrome browser on path, building
+    it on first use. Templates are kept per browser version and prefs. Returns
+    None when the browser version can't be determined."""
+    if profile_templates_path is None:
+        profile_templates_path = get_default_profile_templates_path()
+    if prefs is None:
+        from .get_chromedriver import DEFAULT_CHROME_PREFS
+
+        prefs = DEFAULT_CHROME_PREFS
+
+    platform = get_platform()
+    version = _get_browser_version(platform)
+    if version is None:
+        # one template shared by every unidentified browser could be any build
+        logger.warning("Unknown chrome browser version, not using a profile template")
+        return None
+    template_name = get_profile_template_name(version, prefs)
+    template_dir = os.path.join(profile_templates_path, template_name)
+    if os.path.isdir(template_dir):
+        return template_dir
+
+    with store_lock.store_lock(
+        profile_templates_path, name=PROFILE_TEMPLATE_LOCK_FILENAME
+    ):
+        if os.path.isdir(template_dir):
+            return template_dir
+
+        # build next to the final path so the rename is atomic
+        staging_dir = tempfile.mkdtemp(
+            prefix=f".{template_name}-", dir=profile_templates_path
+        )
+        try:
+            _initialize_profile(staging_dir, platform)
+            _write_prefs(staging_dir, prefs)
+            os.replace(staging_dir, template_dir)
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+    logger.info(f"Built chrome profile template {template_dir}")
+    return template_dir
+
+
+def _reflink_file(src, dst) -> bool:
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copystat(src, dst)
+        return True
+    except OSError as exc:
+        if exc.errno not in REFLINK_UNSUPPORTED_ERRNOS:
+            raise
+        return False
+
+
+def remove_stale_clones(clones_base_path) -> list:
+    """Remove clones whose owning process is gone, e.g. after a crash."""
+    removed = []
+    try:
+        names = os.listdir(clones_base_path)
+    except OSError:
+        return removed
+    for name in names:
+        clone_dir = os.path.join(clones_base_path, name)
+        try:
+            with open(
+                os.path.join(clone_dir, CLONE_OWNER_FILENAME), encoding="utf-8"
+            ) as fh:
+                stale = not owner_alive(fh.read().strip())
+        except OSError:
+            try:
+                age = time.time() - os.stat(clone_dir).st_mtime
+            except OSError:
+                continue
+            stale = age > UNOWNED_CLONE_MAX_AGE_SECONDS
+        if stale:
+            shutil.rmtree(clone_dir, ignore_errors=True)
+            removed.append(clone_dir)
+    if removed:
+        logger.info(f"Removed {len(removed)} stale profile clones")
+    return removed
+
+
+def clone_profile(template_dir, clones_base_path=None) -> str:
+    """Copy `template_dir` into a new private user-data-dir.
+
+    Files are cloned copy-on-write where the filesystem supports it. Hard links
+    would be cheaper still, but chrome rewrites its sqlite files in place, so a
+    linked clone would write through to the template.
+    """
+    if clones_base_path is None:
+        # on the template's filesystem, so that copy-on-write clones are possible
+        clones_base_path = os.path.join(os.path.dirname(template_dir), CLONES_DIRNAME)
+    os.makedirs(clones_base_path, exist_ok=True)
+    remove_stale_clones(clones_base_path)
+    clone_dir = tempfile.mkdtemp(prefix="tgc-profile-", dir=clones_base_path)
+    with open(
+        os.path.join(clone_dir, CLONE_OWNER_FILENAME), "w", encoding="utf-8"
+    ) as fh:
+        fh.write(get_owner_token())
+
+    if sys.platform == "darwin":
+        # apfs clonefile, via cp
+        result = subprocess.run(
+            ["cp", "-cR", f"{template_dir}/.", clone_dir],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        if result.returncode == 0:
+            return clone_dir
+
+    reflink = True
+
+    def copy_function(src, dst):
+        nonlocal reflink
+        if reflink and _reflink_file(src, dst):
+            return dst
+        reflink = False
+        return shutil.copy2(src, dst)
+
+    shutil.copytree(
+        template_dir,
+        clone_dir,
+        copy_function=copy_function,
+        dirs_exist_ok=True,
+        ignore=shutil.ignore_patterns(*PROFILE_LOCK_FILENAMES),
+    )
+    return clone_dir
+
+
+def remove_profile_on_quit(driver, clone_dir) -> None:
+    original_quit = driver.quit
+
+    def quit_and_remove_profile():
+        try:
+            original_quit()
+        finally:
+            shutil.rmtree(clone_dir, ignore_errors=True)
+
+    driver.quit = quit_and_remove_profile
@@ -0,0 +1,135 @@
+import logging
+import socket
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+ROTATE_PER = ("navigation", "request")
+
+
+def _proxy_conf(proxy_string) -> dict:
+    # the same upstream configuration get_chromedriver() launches with
+    if not proxy_string:
+        return {}
+    return {"http": proxy_string, "https": proxy_string, "no_proxy": "localhost"}
+
+
+class _ClientConnections:
+    """Tracks the browser's open connections to the selenium-wire proxy.
+
+    Each client connection is bound to the upstream proxy that was configured
+    when it was accepted, so a rotation has to close them for the browser to
+    reconnect through the new upstream.
+    """
+
+    def __init__(self, server):
+        self._lock = threading.Lock()
+        self._connections = set()
+        handle_client_connection = server.handle_client_connection
+
+        def tracked_handle_client_connection(conn, client_address):
+            with self._lock:
+                self._connections.add(conn)
+            try:
+                return handle_client_connection(conn, client_address)
+            finally:
+                with self._lock:
+                    self._connections.discard(conn)
+
+        server.handle_client_connection = tracked_handle_client_connection
+
+    def close_all(self) -> int:
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        return len(connections)
+
+
+def track_client_connections(driver) -> None:
+    if getattr(driver, "_tgc_client_connections", None) is None:
+        driver._tgc_client_connections = _ClientConnections(
+            driver.backend.master.server
+        )
+
+
+def set_proxy(driver, proxy_string, flush=True) -> None:
+    """Route a selenium-wire driver through `proxy_string` (or directly, for
+    None) without relaunching the browser."""
+    if not hasattr(driver, "backend"):
+        raise Exception("set_proxy() requires a selenium-wire driver.")
+
+    track_client_connections(driver)
+    driver.proxy = _proxy_conf(proxy_string)
+    driver.proxy_string = proxy_string
+    if flush:
+        closed = driver._tgc_client_connections.close_all()
+        logger.debug(f"Switched proxy, closed {closed} client connections")
+
+
+class ProxyRotation:
+    """Rotates a selenium-wire driver through `proxies` (any iterator of proxy
+    strings, e.g. an endless generator).
+
+    per="navigation": switch before every `every`-th driver.get(), closing
+    open connections so the whole page load uses the new proxy.
+    per="request": switch after every `every` requests. Requests already on an
+    open connection finish through the proxy it was opened with, so this
+    spreads load across proxies rather than pinning each request to one.
+    """
+
+    def __init__(self, proxies, every=1, per="navigation"):
+        if per not in ROTATE_PER:
+            raise Exception(f"Unknown rotation {per!r}; choose from {ROTATE_PER}.")
+        if every < 1:
+            raise Exception(f"Rotation interval must be at least 1, not {every}.")
+        self.proxies = iter(proxies)
+        self.every = every
+        self.per = per
+
+        self._lock = threading.Lock()
+        self._count = 0
+        self.rotations = 0
+
+    def next_proxy(self):
+        with self._lock:
+            self.rotations += 1
+            return next(self.proxies)
+
+    def _tick(self) -> int:
+        with self._lock:
+            self._count += 1
+            return self._count
+
+    def attach(self, driver) -> None:
+        track_client_connections(driver)
+        if getattr(driver, "proxy_string", None) is None:
+            set_proxy(driver, self.next_proxy(), flush=False)
+
+        if self.per == "navigation":
+            get = driver.get
+
+            def rotating_get(url):
+                # the first navigation uses the proxy the driver already has
+                navigation = self._tick()
+                if navigation > 1 and (navigation - 1) % self.every == 0:
+                    set_proxy(driver, self.next_proxy())
+                return get(url)
+
+            driver.get = rotating_get
+        else:
+            interceptor = driver.request_interceptor
+
+            def rotating_interceptor(request):
+                if interceptor is not None:
+                    interceptor(request)
+                if self._tick() % self.every == 0:
+                    set_proxy(driver, self.next_proxy(), flush=False)
+
+            driver.request_interceptor = rotating_interceptor
+
+        driver.proxy_rotation = self
@@ -0,0 +1,210 @@
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_EWMA_ALPHA = 0.3
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_COOLDOWN_SECONDS = 30.0
+DEFAULT_MAX_COOLDOWN_SECONDS = 600.0
+# assumed until a proxy's first latency sample arrives
+DEFAULT_INITIAL_LATENCY_SECONDS = 2.0
+
+
+def build_proxy_strings(proxy_credentials) -> dict:
+    """Expand the {"accounts": ..., "weights": ...} credentials layout into
+    {account: [proxy_string, ...]}."""
+    proxy_strings = {}
+    for account, details in proxy_credentials["accounts"].items():
+        user = details["username"]
+        password = details["password"]
+        proxy_strings[account] = [
+            f"{protocol}://{user}:{password}@{host}:{port}"
+            for protocol, hosts in details["hosts"].items()
+            for host, port in hosts
+        ]
+    return proxy_strings
+
+
+class ProxyHealth:
+    __slots__ = (
+        "proxy_string",
+        "account",
+        "weight",
+        "latency",
+        "success_rate",
+        "consecutive_failures",
+        "open_until",
+        "cooldown",
+        "half_open",
+        "successes",
+        "failures",
+    )
+
+    def __init__(self, proxy_string, account, weight):
+        self.proxy_string = proxy_string
+        self.account = account
+        self.weight = weight
+        self.latency = None
+        self.success_rate = 1.0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.cooldown = 0.0
+        self.half_open = False
+        self.successes = 0
+        self.failures = 0
+
+
+class ProxySelector:
+    """Picks proxies weighted toward fast, healthy endpoints.
+
+    Each proxy keeps an EWMA of its latency and success rate. After
+    `failure_threshold` consecutive failures its circuit opens and it is not
+    picked for `cooldown` seconds, doubling on every repeat up to
+    `max_cooldown`; once the cool-down is over, the next report decides
+    whether it closes again or reopens at once. Iterating a selector yields
+    proxy strings forever, so it can stand in for a proxy generator or feed a
+    ProxyRotation.
+    """
+
+    def __init__(
+        self,
+        proxy_credentials,
+        *,
+        alpha=DEFAULT_EWMA_ALPHA,
+        failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+        cooldown=DEFAULT_COOLDOWN_SECONDS,
+        max_cooldown=DEFAULT_MAX_COOLDOWN_SECONDS,
+    ):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self._lock = threading.Lock()
+        self._proxies = {}
+        weights = proxy_credentials["weights"]
+        for account, proxy_strings in build_proxy_strings(proxy_credentials).items():
+            # an account's weight is shared between its endpoints
+            for proxy_string in proxy_strings:
+                self._proxies[proxy_string] = ProxyHealth(
+                    proxy_string, account, weights[account] / len(proxy_strings)
+                )
+        if not self._proxies:
+            raise Exception("ProxySelector needs at least one proxy.")
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.choose()
+
+    def _score(self, health) -> float:
+        latency = health.latency or DEFAULT_INITIAL_LATENCY_SECONDS
+        return health.weight * health.success_rate**2 / max(latency, 0.01)
+
+    def choose(self) -> str:
+        now = time.monotonic()
+        with self._lock:
+            candidates = []
+            for health in self._proxies.values():
+                if health.open_until > now:
+                    continue
+                if health.open_until and not health.half_open:
+                    # cool-down over: allow trial picks until the next report
+                    health.half_open = True
+                candidates.append(health)
+
+            if not candidates:
+                # everything is cooling down; the one that recovers soonest
+                health = min(self._proxies.values(), key=lambda h: h.open_until)
+                return health.proxy_string
+
+            health = random.choices(
+                candidates, weights=[self._score(h) for h in candidates], k=1
+            )[0]
+            return health.proxy_string
+
+    def report(self, proxy_string, ok, latency=None) -> None:
+        """Feed back the outcome of using `proxy_string`."""
+        with self._lock:
+            health = self._proxies.get(proxy_string)
+            if health is None:
+                return
+
+            health.success_rate += self.alpha * (float(ok) - health.success_rate)
+            if ok and latency is not None:
+                if health.latency is None:
+                    health.latency = latency
+                else:
+                    health.latency += self.alpha * (latency - health.latency)
+
+            if ok:
+                health.successes += 1
+                health.consecutive_failures = 0
+                health.open_until = 0.0
+                health.cooldown = 0.0
+                health.half_open = False
+                return
+
+            health.failures += 1
+            health.consecutive_failures += 1
+            if (
+                health.half_open
+                or health.consecutive_failures >= self.failure_threshold
+            ):
+                health.cooldown = min(
+                    self.max_cooldown,
+                    health.cooldown * 2 if health.cooldown else self.base_cooldown,
+                )
+                health.open_until = time.monotonic() + health.cooldown
+                health.half_open = False
+                logger.info(
+                    f"Proxy {health.account} circuit open for {health.cooldown:.0f}s after {health.consecutive_failures} consecutive failures"
+                )
+
+    def stats(self) -> list:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "proxy_string": h.proxy_string,
+                    "account": h.account,
+                    "latency": h.latency,
+                    "success_rate": h.success_rate,
+                    "successes": h.successes,
+                    "failures": h.failures,
+                    "open": h.open_until > now,
+                    "score": self._score(h),
+                }
+                for h in self._proxies.values()
+            ]
+
+
+def attach_proxy_selector(driver, proxy_selector) -> None:
+    """Report every driver.get() to `proxy_selector` against the driver's
+    current proxy: exceptions and, when the request capture index is
+    available, 5xx document responses (proxy errors) count as failures."""
+    get = driver.get
+    # for fetch_many(), whose tabs don't navigate through driver.get()
+    driver.proxy_selector = proxy_selector
+
+    def reporting_get(url):
+        proxy_string = getattr(driver, "proxy_string", None)
+        started_at = time.monotonic()
+        try:
+            result = get(url)
+        except Exception:
+            proxy_selector.report(proxy_string, False)
+            raise
+        ok = True
+        if capture := getattr(driver, "capture", None):
+            status = capture.status(url)
+            ok = status is None or status < 500
+        proxy_selector.report(proxy_string, ok, time.monotonic() - started_at)
+        return result
+
+    driver.get = reporting_get
@@ -0,0 +1,186 @@
+import fnmatch
+import logging
+import threading
+from urllib.parse import urlsplit
+
+from .instrumentation import NULL_METRICS
+
+logger = logging.getLogger(__name__)
+
+
+# file extensions per category, for CDP url globs and as a fallback when a
+# request carries no Sec-Fetch-Dest header
+CATEGORY_EXTENSIONS = {
+    "images": [
+        "apng",
+        "avif",
+        "bmp",
+        "gif",
+        "ico",
+        "jpeg",
+        "jpg",
+        "png",
+        "svg",
+        "webp",
+    ],
+    "fonts": ["eot", "otf", "ttf", "woff", "woff2"],
+    "media": ["flac", "m4a", "m4v", "mov", "mp3", "mp4", "ogg", "wav", "webm"],
+    "stylesheets": ["css"],
+}
+
+# Sec-Fetch-Dest values per category, as sent by chrome
+CATEGORY_FETCH_DESTS = {
+    "images": {"image"},
+    "fonts": {"font"},
+    "media": {"audio", "track", "video"},
+    "stylesheets": {"style"},
+}
+
+CATEGORY_HOSTS = {
+    "analytics": [
+        "doubleclick.net",
+        "google-analytics.com",
+        "googlesyndication.com",
+        "googletagmanager.com",
+        "googletagservices.com",
+        "hotjar.com",
+        "scorecardresearch.com",
+        "segment.io",
+    ],
+}
+
+# rough median transfer sizes, used only to estimate the bytes not fetched
+ESTIMATED_BYTES_PER_REQUEST = {
+    "images": 20_000,
+    "fonts": 30_000,
+    "media": 500_000,
+    "stylesheets": 15_000,
+    "analytics": 30_000,
+    "hosts": 20_000,
+    "urls": 20_000,
+}
+
+BLOCKABLE_CATEGORIES = sorted(set(CATEGORY_EXTENSIONS) | set(CATEGORY_HOSTS))
+
+
+def _host_matches(host, blocked_host):
+    return host == blocked_host or host.endswith("." + blocked_host)
+
+
+class ResourceBlocker:
+    """Stops a driver from fetching whole categories of subresources, plus any
+    request to `hosts` (and their subdomains) or matching the `url_patterns`
+    globs. The top-level document is never blocked by category.
+    """
+
+    def __init__(self, categories=(), *, hosts=(), url_patterns=(), metrics=None):
+        unknown = set(categories) - set(BLOCKABLE_CATEGORIES)
+        if unknown:
+            raise Exception(
+                f"Unknown resource categories {sorted(unknown)}; choose from {BLOCKABLE_CATEGORIES}."
+            )
+
+        self.categories = sorted(set(categories))
+        self.hosts = [h.lower().lstrip(".") for h in hosts]
+        self.url_patterns = list(url_patterns)
+        self.metrics = metrics or NULL_METRICS
+        self.mode = None
+
+        self._extensions = {}
+        self._fetch_dests = {}
+        for category in self.categories:
+            for ext in CATEGORY_EXTENSIONS.get(category, []):
+                self._extensions["." + ext] = category
+            for dest in CATEGORY_FETCH_DESTS.get(category, set()):
+                self._fetch_dests[dest] = category
+        self._blocked_hosts = [(h, "hosts") for h in self.hosts]
+        for category in self.categories:
+            self._blocked_hosts.extend(
+                (h, category) for h in CATEGORY_HOSTS.get(category, [])
+            )
+
+        self._lock = threading.Lock()
+        self._blocked = {}
+
+    @classmethod
+    def from_option(cls, block_resources, metrics=None):
+        """Accept either a ResourceBlocker or an iterable of category names."""
+        if isinstance(block_resources, cls):
+            if metrics is not None:
+                block_resources.metrics = metrics
+            return block_resources
+        return cls(block_resources, metrics=metrics)
+
+    def classify(self, url, fetch_dest=None):
+        """The reason `url` would be blocked, or None if it is allowed."""
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        for blocked_host, reason in self._blocked_hosts:
+            if _host_matches(host, blocked_host):
+                return reason
+        for pattern in self.url_patterns:
+            if fnmatch.fnmatchcase(url, pattern):
+                return "urls"
+        if fetch_dest == "document":
+            return None
+        if fetch_dest and fetch_dest in self._fetch_dests:
+            return self._fetch_dests[fetch_dest]
+        path = parts.path.lower()
+        dot = path.rfind(".")
+        if dot != -1 and path.rfind("/") < dot:
+            return self._extensions.get(path[dot:])
+        return None
+
+    def cdp_url_patterns(self) -> list:
+        extensions = sorted(e[1:] for e in self._extensions)
+        patterns = [f"*.{ext}" for ext in extensions]
+        patterns.extend(f"*.{ext}?*" for ext in extensions)
+        for blocked_host, _ in self._blocked_hosts:
+            patterns.append(f"*://{blocked_host}/*")
+            patterns.append(f"*://*.{blocked_host}/*")
+        patterns.extend(self.url_patterns)
+        return patterns
+
+    def record_blocked(self, reason) -> None:
+        with self._lock:
+            self._blocked[reason] = self._blocked.get(reason, 0) + 1
+        self.metrics.increment("blocked_requests", category=reason)
+
+    def intercept_request(self, request) -> None:
+        """A selenium-wire request_interceptor."""
+        fetch_dest = request.headers.get("Sec-Fetch-Dest")
+        if reason := self.classify(request.url, fetch_dest):
+            self.record_blocked(reason)
+            request.abort(error_code=403)
+
+    def attach(self, driver, use_selenium_wire) -> None:
+        if use_selenium_wire:
+            self.mode = "selenium-wire"
+            driver.request_interceptor = self.intercept_request
+        else:
+            # the browser drops these itself, so nothing is counted in this mode
+            self.mode = "cdp"
+            self.apply_cdp(driver)
+        driver.resource_blocker = self
+
+    def apply_cdp(self, driver) -> None:
+        """Block in the target `driver` is switched to; CDP's block list is per
+        target, so each new tab needs its own."""
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd(
+            "Network.setBlockedURLs", {"urls": self.cdp_url_patterns()}
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            blocked = dict(self._blocked)
+        return {
+            "mode": self.mode,
+            "blocked_requests": sum(blocked.values()) if self.mode != "cdp" else None,
+            "blocked_by_category": blocked,
+            "estimated_bytes_saved": (
+                sum(ESTIMATED_BYTES_PER_REQUEST[k] * v for k, v in blocked.items())
+                if self.mode != "cdp"
+                else None
+            ),
+        }
@@ -0,0 +1,111 @@
+import logging
+import time
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+# each level includes everything the levels before it clear
+RESET_LEVELS = ("light", "standard", "full")
+
+BLANK_URL = "about:blank"
+
+# Storage.clearDataForOrigin storage types cleared at the "standard" level;
+# "full" clears "all", which adds service workers, cache storage and the like
+STANDARD_STORAGE_TYPES = "cookies,local_storage,indexeddb,websql,file_systems"
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _visited_origins(driver, window_urls) -> set:
+    origins = {o for url in window_urls if (o := _origin(url))}
+    if capture := getattr(driver, "capture", None):
+        origins.update(o for entry in capture.entries() if (o := _origin(entry.url)))
+    elif hasattr(driver, "backend"):
+        # selenium-wire without the index: every request in the store, which
+        # covers redirect hops, iframes and pages navigated away from
+        origins.update(o for request in driver.requests if (o := _origin(request.url)))
+    return origins
+
+
+def _close_extra_windows(driver) -> list:
+    """Close all windows but the first, returning the urls they were showing."""
+    urls = []
+    handles = driver.window_handles
+    for handle in reversed(handles):
+        driver.switch_to.window(handle)
+        urls.append(driver.current_url)
+        if handle != handles[0]:
+            driver.close()
+    driver.switch_to.window(handles[0])
+    return urls
+
+
+def is_driver_reusable(driver) -> bool:
+    """Whether `driver` is responsive and back to a single blank window."""
+    try:
+        if len(driver.window_handles) != 1:
+            return False
+        if driver.current_url != BLANK_URL:
+            return False
+        return driver.execute_script("return 1") == 1
+    except Exception as exc:
+        logger.debug(f"Driver is not reusable: {exc}")
+        return False
+
+
+def reset_driver(driver, level="standard", verify=True) -> dict:
+    """Bring `driver` back to a clean state so it can serve another job.
+
+    light: close extra windows, load about:blank, clear the selenium-wire
+    request store.
+    standard: also clear cookies, the http cache, and local storage and
+    indexeddb for every visited origin.
+    full: also clear service workers, cache storage and all other site data.
+
+    Returns {"ok", "level", "seconds", "origins"}; when "ok" is False the driver
+    should be quit and replaced rather than reused.
+    """
+    if level not in RESET_LEVELS:
+        raise Exception(f"Unknown reset level {level!r}; choose from {RESET_LEVELS}.")
+
+    started_at = time.monotonic()
+    result = {"ok": False, "level": level, "seconds": None, "origins": 0}
+    try:
+        window_urls = _close_extra_windows(driver)
+        origins = _visited_origins(driver, window_urls)
+        result["origins"] = len(origins)
+
+        # leave the pages first so that nothing repopulates what is cleared next
+        driver.get(BLANK_URL)
+
+        if level in ("standard", "full"):
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+            storage_types = "all" if level == "full" else STANDARD_STORAGE_TYPES
+            for origin in origins:
+                driver.execute_cdp_cmd(
+                    "Storage.clearDataForOrigin",
+                    {"origin": origin, "storageTypes": storage_types},
+                )
+
+        if level == "full":
+            driver.execute_cdp_cmd("ServiceWorker.enable", {})
+            driver.execute_cdp_cmd("ServiceWorker.stopAllWorkers", {})
+            driver.execute_cdp_cmd("ServiceWorker.disable", {})
+
+        # selenium-wire drivers only
+        if hasattr(driver, "backend"):
+            del driver.requests
+
+        result["ok"] = is_driver_reusable(driver) if verify else True
+    except Exception as exc:
+        logger.warning(f"Cannot reset driver: {exc}")
+
+    result["seconds"] = time.monotonic() - started_at
+    return result
@@ -0,0 +1,113 @@
+import functools
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_STEALTH_OPTIONS = {
+    "languages": ("en-US", "en"),
+    "vendor": "Google Inc.",
+    "platform": "Win32",
+    "webgl_vendor": "Intel Inc.",
+    "renderer": "Intel Iris OpenGL Engine",
+    "fix_hairline": True,
+}
+
+# selenium_stealth.stealth()'s evasions, in its order; "utils" has to come
+# first, since it defines the global the others build on
+STEALTH_EVASIONS = [
+    ("utils.js", ()),
+    ("chrome.app.js", ()),
+    ("chrome.runtime.js", ("run_on_insecure_origins",)),
+    ("iframe.contentWindow.js", ()),
+    ("media.codecs.js", ()),
+    ("navigator.languages.js", ("languages",)),
+    ("navigator.permissions.js", ()),
+    ("navigator.plugins.js", ()),
+    ("navigator.vendor.js", ("vendor",)),
+    ("navigator.webdriver.js", ()),
+    ("webgl.vendor.js", ("webgl_vendor", "renderer")),
+    ("window.outerdimensions.js", ()),
+]
+HAIRLINE_EVASION = ("hairline.fix.js", ())
+
+
+def _evasion_source(filename) -> str:
+    import selenium_stealth
+
+    js_dir = os.path.join(os.path.dirname(selenium_stealth.__file__), "js")
+    with open(os.path.join(js_dir, filename), encoding="utf-8") as fh:
+        return fh.read()
+
+
+@functools.lru_cache(maxsize=None)
+def build_stealth_script(
+    languages=DEFAULT_STEALTH_OPTIONS["languages"],
+    vendor=DEFAULT_STEALTH_OPTIONS["vendor"],
+    webgl_vendor=DEFAULT_STEALTH_OPTIONS["webgl_vendor"],
+    renderer=DEFAULT_STEALTH_OPTIONS["renderer"],
+    fix_hairline=DEFAULT_STEALTH_OPTIONS["fix_hairline"],
+    run_on_insecure_origins=False,
+) -> str:
+    """selenium-stealth's evasion scripts combined into one, built once per
+    parameter set. Each evasion runs in its own try block, as it would in its
+    own script."""
+    args = {
+        "languages": list(languages),
+        "vendor": vendor,
+        "webgl_vendor": webgl_vendor,
+        "renderer": renderer,
+        "run_on_insecure_origins": run_on_insecure_origins,
+    }
+    evasions = STEALTH_EVASIONS + ([HAIRLINE_EVASION] if fix_hairline else [])
+    parts = []
+    for filename, arg_names in evasions:
+        call_args = ", ".join(
+            # selenium-stealth passes None as the string "undefined"
+            json.dumps("undefined" if args[name] is None else args[name])
+            for name in arg_names
+        )
+        parts.append(
+            f"try {{ ({_evasion_source(filename)})({call_args}); }} "
+            f"catch (e) {{ console.debug('stealth {filename}', e); }}"
+        )
+    return "\n".join(parts)
+
+
+def apply_stealth(
+    driver,
+    user_agent=None,
+    languages=DEFAULT_STEALTH_OPTIONS["languages"],
+    vendor=DEFAULT_STEALTH_OPTIONS["vendor"],
+    platform=DEFAULT_STEALTH_OPTIONS["platform"],
+    webgl_vendor=DEFAULT_STEALTH_OPTIONS["webgl_vendor"],
+    renderer=DEFAULT_STEALTH_OPTIONS["renderer"],
+    fix_hairline=DEFAULT_STEALTH_OPTIONS["fix_hairline"],
+    run_on_insecure_origins=False,
+) -> None:
+    """The same evasions as selenium_stealth.stealth(), registered with one
+    Page.addScriptToEvaluateOnNewDocument call instead of one per evasion."""
+    script = build_stealth_script(
+        tuple(languages),
+        vendor,
+        webgl_vendor,
+        renderer,
+        fix_hairline,
+        run_on_insecure_origins,
+    )
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": script})
+
+    if user_agent is None:
+        # whatever the browser sends, including a --user-agent it was launched with
+        user_agent = driver.execute_cdp_cmd("Browser.getVersion", {})["userAgent"]
+    # hide headless chrome
+    override = {"userAgent": user_agent.replace("HeadlessChrome", "Chrome")}
+    if languages:
+        override["acceptLanguage"] = ",".join(languages)
+    if platform:
+        override["platform"] = platform
+    driver.execute_cdp_cmd("Network.setUserAgentOverride", override)
+    # both only apply to the current tab; fetch_many() repeats them in its own
+    driver.stealth_setup = {"script": script, "user_agent_override": override}
@@ -1,3 +1,21 @@
+from .chromedriver_store import (
+    DEFAULT_MAX_CHROMEDRIVER_VERSIONS,
+    evict_chromedrivers,
+    get_default_chromedrivers_base_path,
+)
+from .prefetch import build_mirror, prefetch_chromedrivers, serve_mirror
+from .store_lock import get_lock_stats
 from .update_chromedriver import match_chromedriver_to_chrome_browser
+from .version_index import VersionIndex
 
-__all__ = ["match_chromedriver_to_chrome_browser"]
+__all__ = [
+    "build_mirror",
+    "DEFAULT_MAX_CHROMEDRIVER_VERSIONS",
+    "evict_chromedrivers",
+    "get_default_chromedrivers_base_path",
+    "get_lock_stats",
+    "match_chromedriver_to_chrome_browser",
+    "prefetch_chromedrivers",
+    "serve_mirror",
+    "VersionIndex",
+]
@@ -0,0 +1,5 @@
+import sys
+
+from .prefetch import main
+
+sys.exit(main())
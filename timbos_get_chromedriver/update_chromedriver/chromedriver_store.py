@@ -0,0 +1,267 @@
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+from ..instrumentation import NULL_METRICS
+from . import store_lock
+from .downloads import DOWNLOAD_CHUNK_SIZE, download_binary_file
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_CHROMEDRIVER_VERSIONS = 4
+STORE_INDEX_FILENAME = "store_index.json"
+STAGING_DIRNAME = ".staging"
+
+# only rewrite the index for a plain "use" once per this many seconds per version
+LAST_USED_RESOLUTION_SECONDS = 3600
+
+
+def get_default_chromedrivers_base_path() -> str:
+    if env_path := os.environ.get("TGC_CHROMEDRIVERS_PATH"):
+        return env_path
+
+    if sys.platform.startswith("win32"):
+        cache_root = os.environ.get("LOCALAPPDATA") or os.path.join(
+            os.path.expanduser("~"), "AppData", "Local"
+        )
+    elif sys.platform == "darwin":
+        cache_root = os.path.join(os.path.expanduser("~"), "Library", "Caches")
+    else:
+        cache_root = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+
+    return os.path.join(cache_root, "timbos_get_chromedriver", "chromedrivers")
+
+
+def get_dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def load_store_index(chromedrivers_base_path: str) -> dict:
+    try:
+        with open(
+            os.path.join(chromedrivers_base_path, STORE_INDEX_FILENAME),
+            encoding="utf-8",
+        ) as fh:
+            index = json.load(fh)
+    except (OSError, ValueError):
+        return {"versions": {}}
+
+    if not isinstance(index.get("versions"), dict):
+        return {"versions": {}}
+    return index
+
+
+def save_store_index(chromedrivers_base_path: str, index: dict) -> None:
+    """Write the index atomically; callers hold the store lock."""
+    index_path = os.path.join(chromedrivers_base_path, STORE_INDEX_FILENAME)
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=f"{STORE_INDEX_FILENAME}.",
+            suffix=".tmp",
+            dir=chromedrivers_base_path,
+        )
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(index, fh, indent=1, sort_keys=True)
+        os.replace(tmp_path, index_path)
+    except OSError as exc:
+        logger.warning(f"Cannot write chromedriver store index {index_path}: {exc}")
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def record_chromedriver_install(
+    chromedrivers_base_path: str, version: str, pinned=False
+) -> None:
+    with store_lock.store_lock(chromedrivers_base_path):
+        index = load_store_index(chromedrivers_base_path)
+        previous = index["versions"].get(version, {})
+        index["versions"][version] = {
+            "size": get_dir_size(os.path.join(chromedrivers_base_path, version)),
+            "last_used": time.time(),
+            # prefetched versions stay until removed by hand
+            "pinned": pinned or previous.get("pinned", False),
+        }
+        save_store_index(chromedrivers_base_path, index)
+
+
+def _use_is_recent(index: dict, version: str, now: float) -> bool:
+    entry = index["versions"].get(version)
+    return (
+        entry is not None
+        and now - entry.get("last_used", 0) < LAST_USED_RESOLUTION_SECONDS
+    )
+
+
+def record_chromedriver_use(chromedrivers_base_path: str, version: str) -> None:
+    now = time.time()
+    # most uses are recent enough to skip, which needs no lock
+    if _use_is_recent(load_store_index(chromedrivers_base_path), version, now):
+        return
+
+    with store_lock.store_lock(chromedrivers_base_path):
+        index = load_store_index(chromedrivers_base_path)
+        if _use_is_recent(index, version, now):
+            return
+        entry = index["versions"].get(version)
+        if entry is None:
+            # installed by an older release or by hand, so size it now
+            entry = {
+                "size": get_dir_size(os.path.join(chromedrivers_base_path, version)),
+                "last_used": 0,
+            }
+            index["versions"][version] = entry
+        entry["last_used"] = now
+        save_store_index(chromedrivers_base_path, index)
+
+
+def evict_chromedrivers(
+    chromedrivers_base_path: str,
+    max_bytes=None,
+    max_versions=DEFAULT_MAX_CHROMEDRIVER_VERSIONS,
+    keep=(),
+) -> list:
+    if max_bytes is None and max_versions is None:
+        return []
+
+    with store_lock.store_lock(chromedrivers_base_path):
+        return _evict_chromedrivers(
+            chromedrivers_base_path, max_bytes, max_versions, keep
+        )
+
+
+def _evict_chromedrivers(chromedrivers_base_path, max_bytes, max_versions, keep):
+    index = load_store_index(chromedrivers_base_path)
+    versions = index["versions"]
+
+    # reconcile the index with what is actually on disk
+    on_disk = set()
+    for d in os.listdir(chromedrivers_base_path):
+        if os.path.isdir(os.path.join(chromedrivers_base_path, d)) and all(
+            part.isdigit() for part in d.split(".")
+        ):
+            on_disk.add(d)
+    for version in list(versions):
+        if version not in on_disk:
+            del versions[version]
+    for version in on_disk - set(versions):
+        versions[version] = {
+            "size": get_dir_size(os.path.join(chromedrivers_base_path, version)),
+            "last_used": 0,
+        }
+
+    total_bytes = sum(v["size"] for v in versions.values())
+    least_recently_used_first = sorted(
+        versions, key=lambda version: versions[version]["last_used"]
+    )
+
+    evicted = []
+    for version in least_recently_used_first:
+        over_bytes = max_bytes is not None and total_bytes > max_bytes
+        over_versions = max_versions is not None and len(versions) > max_versions
+        if not (over_bytes or over_versions):
+            break
+        if version in keep or versions[version].get("pinned"):
+            continue
+
+        try:
+            shutil.rmtree(os.path.join(chromedrivers_base_path, version))
+        except OSError as exc:
+            logger.warning(f"Cannot evict chromedriver {version}: {exc}")
+            continue
+
+        total_bytes -= versions[version]["size"]
+        del versions[version]
+        evicted.append(version)
+        logger.info(
+            f"Evicted chromedriver {version} from {chromedrivers_base_path} (least recently used)"
+        )
+
+    save_store_index(chromedrivers_base_path, index)
+    return evicted
+
+
+def get_chromedriver_path(
+    chromedrivers_base_path: str, version: str, subdir_name: str, executable: str
+) -> str:
+    return os.path.join(chromedrivers_base_path, version, subdir_name, executable)
+
+
+def install_chromedriver(
+    download_url: str,
+    chromedrivers_base_path: str,
+    version: str,
+    subdir_name: str,
+    executable: str,
+    metrics=NULL_METRICS,
+) -> str:
+    final_path = get_chromedriver_path(
+        chromedrivers_base_path, version, subdir_name, executable
+    )
+    member_name = f"{subdir_name}/{executable}"
+
+    # stage on the same filesystem as the store so the final rename is atomic
+    staging_dir = os.path.join(chromedrivers_base_path, STAGING_DIRNAME)
+    os.makedirs(staging_dir, exist_ok=True)
+    staging_prefix = os.path.join(
+        staging_dir, f"{version}-{subdir_name}-{os.getpid()}-{threading.get_ident()}"
+    )
+    zip_path = f"{staging_prefix}.zip"
+    staged_executable_path = f"{staging_prefix}.{executable}"
+
+    try:
+        # a zip's central directory is at its end, so the archive has to land
+        # before the member can be located; only that member is ever unpacked
+        download_stats = download_binary_file(download_url, zip_path)
+        metrics.observe("download_bytes", download_stats["bytes"], version=version)
+        metrics.observe("download_seconds", download_stats["seconds"], version=version)
+        if download_stats["time_to_first_byte"] is not None:
+            metrics.observe(
+                "download_time_to_first_byte_seconds",
+                download_stats["time_to_first_byte"],
+                version=version,
+            )
+
+        with zipfile.ZipFile(zip_path, "r") as z:
+            try:
+                member = z.getinfo(member_name)
+            except KeyError:
+                raise Exception(f"{download_url} does not contain {member_name}")
+
+            fd = os.open(
+                staged_executable_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o755
+            )
+            with os.fdopen(fd, "wb") as out, z.open(member) as src:
+                shutil.copyfileobj(src, out, DOWNLOAD_CHUNK_SIZE)
+                out.flush()
+                os.fsync(out.fileno())
+
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(staged_executable_path, final_path)
+    finally:
+        for leftover in (zip_path, f"{zip_path}.part", staged_executable_path):
+            try:
+                os.remove(leftover)
+            except OSError:
+                pass
+
+    return final_path
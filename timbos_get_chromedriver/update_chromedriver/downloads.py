@@ -0,0 +1,205 @@
+import base64
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+import urllib.parse
+
+logger = logging.getLogger(__name__)
+
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DEFAULT_DOWNLOAD_RETRIES = 4
+DEFAULT_DOWNLOAD_BACKOFF_SECONDS = 0.5
+DEFAULT_DOWNLOAD_TIMEOUT = (10, 60)  # (connect, read) seconds
+
+# callables that receive the stats dict of every completed download
+download_hooks = []
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            # imported here so that importing the package stays cheap
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _local_path_from_url(url: str):
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme == "file":
+        # urllib.request pulls in http.client and ssl, so only import it here
+        from urllib.request import url2pathname
+
+        return url2pathname(parsed.path)
+    if parsed.scheme in ("http", "https"):
+        return None
+    # a bare path, including windows drive letters that parse as a scheme
+    return url
+
+
+def _md5_from_goog_hash(response):
+    # storage.googleapis.com sends e.g. "x-goog-hash: crc32c=...,md5=<base64>"
+    for part in response.headers.get("x-goog-hash", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name == "md5" and value:
+            return base64.b64decode(value).hex()
+    return None
+
+
+def _file_digest(path: str, algorithm: str) -> str:
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as fh:
+        while chunk := fh.read(DOWNLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def download_binary_file(
+    url: str,
+    path: str,
+    expected_size=None,
+    expected_sha256=None,
+    retries=DEFAULT_DOWNLOAD_RETRIES,
+    backoff=DEFAULT_DOWNLOAD_BACKOFF_SECONDS,
+    timeout=DEFAULT_DOWNLOAD_TIMEOUT,
+) -> dict:
+    part_path = f"{path}.part"
+
+    started_at = time.monotonic()
+    time_to_first_byte = None
+    resumed_from = 0
+    total_size = expected_size
+    expected_md5 = None
+    attempt = 0
+
+    if local_path := _local_path_from_url(url):
+        # a mirror directory; there is nothing to resume or retry
+        attempt = 1
+        try:
+            shutil.copyfile(local_path, part_path)
+        except OSError as exc:
+            raise Exception(f"Cannot download {url}: {exc}")
+        time_to_first_byte = time.monotonic() - started_at
+    else:
+        import requests
+
+        session = get_http_session()
+        while True:
+            attempt += 1
+            try:
+                existing_size = os.path.getsize(part_path)
+            except OSError:
+                existing_size = 0
+
+            headers = {}
+            if existing_size:
+                headers["Range"] = f"bytes={existing_size}-"
+
+            try:
+                request_started_at = time.monotonic()
+                with session.get(
+                    url, headers=headers, stream=True, timeout=timeout
+                ) as response:
+                    if time_to_first_byte is None:
+                        time_to_first_byte = time.monotonic() - request_started_at
+
+                    if response.status_code == 416:
+                        # our partial file is unusable against the current object
+                        os.remove(part_path)
+                        raise requests.HTTPError(f"HTTP 416 for {url}")
+
+                    if response.status_code == 206 and existing_size:
+                        mode = "ab"
+                        resumed_from = resumed_from or existing_size
+                        content_range = response.headers.get("Content-Range", "")
+                        if "/" in content_range and content_range[-1] != "*":
+                            total_size = total_size or int(
+                                content_range.rsplit("/", 1)[1]
+                            )
+                    elif response.status_code == 200:
+                        mode = "wb"
+                        if "Content-Length" in response.headers:
+                            total_size = total_size or int(
+                                response.headers["Content-Length"]
+                            )
+                        expected_md5 = _md5_from_goog_hash(response)
+                    elif 400 <= response.status_code < 500:
+                        raise Exception(
+                            f"Cannot download {url}: HTTP {response.status_code}"
+                        )
+                    else:
+                        raise requests.HTTPError(
+                            f"HTTP {response.status_code} for {url}", response=response
+                        )
+
+                    with open(part_path, mode) as fh:
+                        for chunk in response.iter_content(
+                            chunk_size=DOWNLOAD_CHUNK_SIZE
+                        ):
+                            fh.write(chunk)
+                break
+
+            except (requests.RequestException, OSError) as exc:
+                if attempt > retries:
+                    raise Exception(
+                        f"Cannot download {url} after {attempt} attempts: {exc}"
+                    )
+                delay = backoff * 2 ** (attempt - 1)
+                logger.warning(
+                    f"Download of {url} interrupted ({exc}); retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
+
+    # verify
+    actual_size = os.path.getsize(part_path)
+    problem = None
+    if total_size is not None and actual_size != total_size:
+        problem = f"expected {total_size} bytes, got {actual_size}"
+    elif expected_sha256 and _file_digest(part_path, "sha256") != expected_sha256:
+        problem = "sha256 mismatch"
+    elif expected_md5 and _file_digest(part_path, "md5") != expected_md5:
+        problem = "md5 mismatch against x-goog-hash"
+    if problem:
+        os.remove(part_path)
+        raise Exception(f"Downloaded {url} failed verification: {problem}")
+
+    os.replace(part_path, path)
+
+    seconds = time.monotonic() - started_at
+    stats = {
+        "url": url,
+        "path": path,
+        "bytes": actual_size,
+        "seconds": seconds,
+        "bytes_per_second": (actual_size - resumed_from) / seconds if seconds else 0.0,
+        "time_to_first_byte": time_to_first_byte,
+        "attempts": attempt,
+        "resumed_from": resumed_from,
+    }
+    logger.info(
+        f"Downloaded {actual_size} bytes from {url} in {seconds:.2f}s "
+        f"({stats['bytes_per_second'] / 1024:.0f} KiB/s, TTFB {time_to_first_byte:.3f}s, "
+        f"{attempt} attempt(s))",
+        extra={"download_stats": stats},
+    )
+    for hook in download_hooks:
+        try:
+            hook(stats)
+        except Exception as exc:
+            logger.warning(f"Download hook {hook!r} failed: {exc}")
+
+    return stats
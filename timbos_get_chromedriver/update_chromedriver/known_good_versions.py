@@ -0,0 +1,195 @@
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from .downloads import _local_path_from_url, get_http_session
+from .version_index import VersionIndex
+
+logger = logging.getLogger(__name__)
+
+
+GOOGLE_JSON_ENDPOINT = "https://googlechromelabs.github.io/chrome-for-testing/known-good-versions-with-downloads.json"
+DEFAULT_KNOWN_GOOD_VERSIONS_TTL_SECONDS = 6 * 60 * 60
+
+KNOWN_GOOD_VERSIONS_CACHE_FILENAME = "known-good-versions-with-downloads.json"
+KNOWN_GOOD_VERSIONS_META_FILENAME = "known-good-versions-with-downloads.meta.json"
+KNOWN_GOOD_VERSIONS_INDEX_FILENAME = "known-good-versions-index.json"
+
+# manifest path -> (source stat, VersionIndex)
+_index_memo = {}
+_index_memo_lock = threading.Lock()
+
+
+def get_known_good_versions_url() -> str:
+    return os.environ.get("TGC_KNOWN_GOOD_VERSIONS_URL") or GOOGLE_JSON_ENDPOINT
+
+
+def resolve_download_url(manifest_url: str, url: str) -> str:
+    """Download urls in a mirror's manifest are relative to the manifest."""
+    if urllib.parse.urlparse(url).scheme in ("http", "https", "file"):
+        return url
+    if local_path := _local_path_from_url(manifest_url):
+        return os.path.join(os.path.dirname(local_path), *url.split("/"))
+    return urllib.parse.urljoin(manifest_url, url)
+
+
+def _read_json(path: str) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _write_atomically(path: str, data: bytes) -> None:
+    # unique per writer, since threads of one process may refresh at once
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f"{os.path.basename(path)}.",
+        suffix=".tmp",
+        dir=os.path.dirname(path) or ".",
+    )
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _refresh_cached_copy(cache_dir: str, url: str, ttl):
+    # returns (path of an up-to-date copy on disk, parsed json if already parsed)
+    if local_path := _local_path_from_url(url):
+        logger.info(f"Reading known-good chromedriver versions from {local_path}")
+        return local_path, None
+
+    body_path = os.path.join(cache_dir, KNOWN_GOOD_VERSIONS_CACHE_FILENAME)
+    meta_path = os.path.join(cache_dir, KNOWN_GOOD_VERSIONS_META_FILENAME)
+
+    try:
+        meta = _read_json(meta_path)
+    except (OSError, ValueError):
+        meta = {}
+    have_cached_body = os.path.isfile(body_path) and meta.get("url") == url
+
+    if have_cached_body and time.time() - meta.get("fetched_at", 0) < ttl:
+        return body_path, None
+
+    headers = {}
+    if have_cached_body:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        response = get_http_session().get(url, headers=headers, timeout=60)
+    except Exception as exc:
+        if have_cached_body:
+            logger.warning(
+                f"Cannot revalidate {url} ({exc}); using cached copy from {body_path}"
+            )
+            return body_path, None
+        raise Exception(f"Cannot resolve url {url}: {exc}")
+
+    if response.status_code == 304 and have_cached_body:
+        logger.debug(f"{url} not modified since last fetch")
+        meta["fetched_at"] = time.time()
+        _write_atomically(meta_path, json.dumps(meta).encode("utf-8"))
+        return body_path, None
+
+    if response.status_code != 200:
+        if have_cached_body:
+            logger.warning(
+                f"Got HTTP {response.status_code} revalidating {url}; using cached copy from {body_path}"
+            )
+            return body_path, None
+        raise Exception(f"Cannot resolve url {url}: HTTP {response.status_code}")
+
+    known_good_versions = response.json()
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_atomically(body_path, response.content)
+        _write_atomically(
+            meta_path,
+            json.dumps(
+                {
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "fetched_at": time.time(),
+                }
+            ).encode("utf-8"),
+        )
+    except OSError as exc:
+        logger.warning(f"Cannot cache {url} under {cache_dir}: {exc}")
+        tmp_dir = tempfile.mkdtemp()
+        body_path = os.path.join(tmp_dir, KNOWN_GOOD_VERSIONS_CACHE_FILENAME)
+        _write_atomically(body_path, response.content)
+
+    return body_path, known_good_versions
+
+
+def fetch_known_good_versions(
+    cache_dir: str,
+    url=None,
+    ttl=DEFAULT_KNOWN_GOOD_VERSIONS_TTL_SECONDS,
+) -> dict:
+    body_path, known_good_versions = _refresh_cached_copy(
+        cache_dir, url or get_known_good_versions_url(), ttl
+    )
+    if known_good_versions is None:
+        known_good_versions = _read_json(body_path)
+    return known_good_versions
+
+
+def get_version_index(
+    cache_dir: str,
+    url=None,
+    ttl=DEFAULT_KNOWN_GOOD_VERSIONS_TTL_SECONDS,
+) -> VersionIndex:
+    url = url or get_known_good_versions_url()
+    body_path, known_good_versions = _refresh_cached_copy(cache_dir, url, ttl)
+
+    # the index is valid for exactly one copy of the manifest on disk
+    st = os.stat(body_path)
+    source = {"path": body_path, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    with _index_memo_lock:
+        memo = _index_memo.get(body_path)
+    if memo is not None and memo[0] == source:
+        return memo[1]
+
+    index_path = os.path.join(cache_dir, KNOWN_GOOD_VERSIONS_INDEX_FILENAME)
+    version_index = None
+    if known_good_versions is None:
+        try:
+            saved = _read_json(index_path)
+            if saved.get("source") == source:
+                version_index = VersionIndex.from_dict(saved["index"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    if version_index is None:
+        if known_good_versions is None:
+            known_good_versions = _read_json(body_path)
+        version_index = VersionIndex.from_known_good_versions(
+            known_good_versions,
+            resolve_url=functools.partial(resolve_download_url, url),
+        )
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            saved = {"source": source, "index": version_index.to_dict()}
+            _write_atomically(index_path, json.dumps(saved).encode("utf-8"))
+        except OSError as exc:
+            logger.warning(f"Cannot write version index {index_path}: {exc}")
+
+    with _index_memo_lock:
+        _index_memo[body_path] = (source, version_index)
+    return version_index
@@ -0,0 +1,368 @@
+import concurrent.futures
+import functools
+import json
+import logging
+import os
+import sys
+import time
+
+from . import chromedriver_store, known_good_versions, store_lock
+from .downloads import download_binary_file
+from .update_chromedriver import get_platform, platform_to
+from .version_index import parse_version
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PREFETCH_WORKERS = 4
+MIRROR_MANIFEST_FILENAME = known_good_versions.KNOWN_GOOD_VERSIONS_CACHE_FILENAME
+DEFAULT_MIRROR_PORT = 8000
+
+
+def get_chromedriver_layout(google_platform: str) -> tuple:
+    """(subdir name, executable) of a chromedriver zip for a Chrome for Testing
+    platform, e.g. ("chromedriver-win64", "chromedriver.exe")."""
+    if google_platform.startswith("win"):
+        return f"chromedriver-{google_platform}", "chromedriver.exe"
+    return f"chromedriver-{google_platform}", "chromedriver"
+
+
+def _google_platform(platform: str) -> str:
+    # accept this package's platform names ("linux", "windows") as well
+    return platform_to["google_platform_designation"].get(platform, platform)
+
+
+def select_chromedrivers(
+    version_index, google_platforms, last_majors=None, versions=()
+) -> tuple:
+    """Pick downloads out of `version_index`: the newest version of each of the
+    `last_majors` most recent majors, plus each of `versions`, which may be
+    exact versions or bare majors ("120" for the newest 120.x).
+
+    Returns ([(version, google platform, url), ...], [(version, google
+    platform), ...] that the manifest does not have).
+    """
+    selected = {}
+    missing = []
+    for google_platform in google_platforms:
+        available = version_index.versions(google_platform)
+        if not available:
+            logger.warning(f"No chromedrivers for {google_platform} in the manifest")
+
+        newest_of_major = {}
+        for version in available:
+            newest_of_major[int(version.split(".")[0])] = version
+
+        wanted = []
+        if last_majors:
+            wanted.extend(
+                newest_of_major[major]
+                for major in sorted(newest_of_major)[-last_majors:]
+            )
+        for version in versions:
+            if "." not in version:
+                version = newest_of_major.get(int(version), version)
+            if version_index.exact(version, google_platform) is None:
+                missing.append((version, google_platform))
+                continue
+            wanted.append(version)
+
+        for version in wanted:
+            _, url = version_index.exact(version, google_platform)
+            selected[(version, google_platform)] = url
+
+    return [(v, p, url) for (v, p), url in selected.items()], missing
+
+
+def _get_selection(
+    cache_dir, last_majors, versions, platforms, known_good_versions_url
+) -> tuple:
+    if not last_majors and not versions:
+        raise Exception("Choose chromedrivers with last_majors and/or versions.")
+    google_platforms = [_google_platform(p) for p in platforms or [get_platform()]]
+    version_index = known_good_versions.get_version_index(
+        cache_dir, url=known_good_versions_url
+    )
+    return select_chromedrivers(version_index, google_platforms, last_majors, versions)
+
+
+def _run_parallel(fn, items, workers) -> list:
+    results = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fn, *item): item for item in items}
+        for future in concurrent.futures.as_completed(futures):
+            results.append(future.result())
+    return sorted(
+        results, key=lambda r: (r["google_platform"], parse_version(r["version"]))
+    )
+
+
+def _new_result(version, google_platform, status, path=None, error=None) -> dict:
+    return {
+        "version": version,
+        "google_platform": google_platform,
+        "status": status,
+        "path": path,
+        "error": error,
+    }
+
+
+def prefetch_chromedrivers(
+    chromedrivers_base_path=None,
+    last_majors=None,
+    versions=(),
+    platforms=None,
+    known_good_versions_url=None,
+    workers=DEFAULT_PREFETCH_WORKERS,
+) -> list:
+    """Download the selected chromedrivers into the store that
+    match_chromedriver_to_chrome_browser() scans, `workers` at a time.
+
+    `platforms` are Chrome for Testing platforms ("linux64", "win64",
+    "mac-arm64", ...) or this package's names ("linux", "windows"); the
+    default is the current platform. Prefetched versions are pinned, so
+    eviction never removes them. Returns one dict per chromedriver (version,
+    google_platform, status of "installed", "present", "missing" or
+    "failed", path, error).
+    """
+    if not chromedrivers_base_path:
+        chromedrivers_base_path = (
+            chromedriver_store.get_default_chromedrivers_base_path()
+        )
+    os.makedirs(chromedrivers_base_path, exist_ok=True)
+
+    selected, missing = _get_selection(
+        chromedrivers_base_path,
+        last_majors,
+        versions,
+        platforms,
+        known_good_versions_url,
+    )
+
+    def install(version, google_platform, url):
+        subdir_name, executable = get_chromedriver_layout(google_platform)
+        path = chromedriver_store.get_chromedriver_path(
+            chromedrivers_base_path, version, subdir_name, executable
+        )
+        if os.path.isfile(path):
+            return _new_result(version, google_platform, "present", path)
+        try:
+            chromedriver_store.install_chromedriver(
+                url, chromedrivers_base_path, version, subdir_name, executable
+            )
+        except Exception as exc:
+            logger.warning(
+                f"Cannot prefetch chromedriver {version} {google_platform}: {exc}"
+            )
+            return _new_result(version, google_platform, "failed", error=str(exc))
+        logger.info(f"Prefetched chromedriver {version} {google_platform} to {path}")
+        return _new_result(version, google_platform, "installed", path)
+
+    results = _run_parallel(install, selected, workers)
+
+    # the store index is read-modify-write, so record under the store lock
+    with store_lock.store_lock(chromedrivers_base_path):
+        for version in sorted({r["version"] for r in results if r["path"]}):
+            chromedriver_store.record_chromedriver_install(
+                chromedrivers_base_path, version, pinned=True
+            )
+
+    return results + [_new_result(v, p, "missing") for v, p in missing]
+
+
+def _load_mirror_manifest(manifest_path) -> dict:
+    try:
+        with open(manifest_path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {"versions": []}
+
+
+def build_mirror(
+    mirror_dir,
+    last_majors=None,
+    versions=(),
+    platforms=None,
+    known_good_versions_url=None,
+    workers=DEFAULT_PREFETCH_WORKERS,
+) -> list:
+    """Download the selected chromedriver zips into `mirror_dir`, laid out as
+    <version>/<platform>/chromedriver-<platform>.zip, next to a
+    known-good-versions manifest that lists them with relative urls.
+
+    Point known_good_versions_url (or TGC_KNOWN_GOOD_VERSIONS_URL) at that
+    manifest, as a path or as served by serve_mirror(), to resolve and
+    download chromedrivers without reaching googlechromelabs.github.io. Runs
+    add to an existing mirror. Returns one dict per chromedriver, as
+    prefetch_chromedrivers() does.
+    """
+    os.makedirs(mirror_dir, exist_ok=True)
+    manifest_path = os.path.join(mirror_dir, MIRROR_MANIFEST_FILENAME)
+
+    # the upstream manifest is cached in a subdirectory, apart from the mirror's
+    cache_dir = os.path.join(mirror_dir, ".cache")
+    selected, missing = _get_selection(
+        cache_dir, last_majors, versions, platforms, known_good_versions_url
+    )
+
+    def mirror(version, google_platform, url):
+        relative_url = f"{version}/{google_platform}/chromedriver-{google_platform}.zip"
+        path = os.path.join(mirror_dir, *relative_url.split("/"))
+        if os.path.isfile(path):
+            return _new_result(version, google_platform, "present", relative_url)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            download_binary_file(url, path)
+        except Exception as exc:
+            logger.warning(
+                f"Cannot mirror chromedriver {version} {google_platform}: {exc}"
+            )
+            return _new_result(version, google_platform, "failed", error=str(exc))
+        return _new_result(version, google_platform, "installed", relative_url)
+
+    results = _run_parallel(mirror, selected, workers)
+
+    manifest = _load_mirror_manifest(manifest_path)
+    downloads = {
+        entry["version"]: {
+            c["platform"]: c["url"] for c in entry["downloads"]["chromedriver"]
+        }
+        for entry in manifest["versions"]
+    }
+    for result in results:
+        if result["path"]:
+            downloads.setdefault(result["version"], {})[result["google_platform"]] = (
+                result["path"]
+            )
+
+    manifest = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+        "versions": [
+            {
+                "version": version,
+                "downloads": {
+                    "chromedriver": [
+                        {"platform": p, "url": url}
+                        for p, url in sorted(downloads[version].items())
+                    ]
+                },
+            }
+            for version in sorted(downloads, key=parse_version)
+        ],
+    }
+    known_good_versions._write_atomically(
+        manifest_path, json.dumps(manifest, indent=1).encode("utf-8")
+    )
+
+    return results + [_new_result(v, p, "missing") for v, p in missing]
+
+
+def serve_mirror(mirror_dir, host="127.0.0.1", port=DEFAULT_MIRROR_PORT) -> None:
+    """Serve `mirror_dir` over HTTP until interrupted; its manifest is then at
+    http://<host>:<port>/known-good-versions-with-downloads.json."""
+    # imported here so that importing the package stays cheap
+    import http.server
+
+    handler = functools.partial(
+        http.server.SimpleHTTPRequestHandler, directory=mirror_dir
+    )
+    with http.server.ThreadingHTTPServer((host, port), handler) as server:
+        logger.info(
+            f"Serving {mirror_dir} at http://{host}:{server.server_port}/{MIRROR_MANIFEST_FILENAME}"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def _add_selection_arguments(parser) -> None:
+    parser.add_argument(
+        "--last-majors",
+        type=int,
+        metavar="N",
+        help="the newest chromedriver of each of the last N major versions",
+    )
+    parser.add_argument(
+        "--versions",
+        nargs="+",
+        default=[],
+        metavar="VERSION",
+        help="exact versions, or bare majors for their newest version",
+    )
+    parser.add_argument(
+        "--platforms",
+        nargs="+",
+        metavar="PLATFORM",
+        help="Chrome for Testing platforms, e.g. linux64 win64 (default: this one)",
+    )
+    parser.add_argument(
+        "--known-good-versions-url",
+        help="the manifest to read, e.g. a mirror's (default: "
+        "$TGC_KNOWN_GOOD_VERSIONS_URL or googlechromelabs.github.io)",
+    )
+    parser.add_argument("--workers", type=int, default=DEFAULT_PREFETCH_WORKERS)
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="tgc-prefetch",
+        description="Download chromedrivers ahead of time, into a store or a mirror.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    store_parser = subparsers.add_parser(
+        "store", help="install chromedrivers into a chromedriver store"
+    )
+    store_parser.add_argument(
+        "--path",
+        help="the store (default: $TGC_CHROMEDRIVERS_PATH or the per-user cache)",
+    )
+    _add_selection_arguments(store_parser)
+
+    mirror_parser = subparsers.add_parser(
+        "mirror", help="download chromedriver zips and a manifest into a directory"
+    )
+    mirror_parser.add_argument("mirror_dir")
+    _add_selection_arguments(mirror_parser)
+
+    serve_parser = subparsers.add_parser("serve", help="serve a mirror over HTTP")
+    serve_parser.add_argument("mirror_dir")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_MIRROR_PORT)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "serve":
+        serve_mirror(args.mirror_dir, host=args.host, port=args.port)
+        return 0
+
+    selection = {
+        "last_majors": args.last_majors,
+        "versions": args.versions,
+        "platforms": args.platforms,
+        "known_good_versions_url": args.known_good_versions_url,
+        "workers": args.workers,
+    }
+    try:
+        if args.command == "store":
+            results = prefetch_chromedrivers(args.path, **selection)
+        else:
+            results = build_mirror(args.mirror_dir, **selection)
+    except Exception as exc:
+        print(f"tgc-prefetch: {exc}", file=sys.stderr)
+        return 1
+
+    for r in results:
+        print(
+            f"{r['status']:<10} {r['google_platform']:<10} {r['version']:<16} "
+            f"{r['path'] or r['error'] or ''}"
+        )
+    return 0 if all(r["status"] in ("installed", "present") for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from . import chromedriver_store
+
+logger = logging.getLogger(__name__)
+
+
+RESOLUTION_CACHE_FILENAME = "resolution_cache.json"
+
+# (chromedrivers_base_path, fingerprint key) -> {"path", "version", "use_recorded_at"}
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def get_chrome_browser_fingerprint(chrome_browser_executable: str):
+    which_path = shutil.which(chrome_browser_executable)
+    if not which_path:
+        return None
+
+    real_path = os.path.realpath(which_path)
+    try:
+        st = os.stat(real_path)
+    except OSError:
+        return None
+
+    return {
+        "path": real_path,
+        "inode": st.st_ino,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+    }
+
+
+def _fingerprint_key(fingerprint: dict) -> str:
+    return f"{fingerprint['path']}|{fingerprint['inode']}|{fingerprint['size']}|{fingerprint['mtime_ns']}"
+
+
+def _load_manifest(chromedrivers_base_path: str) -> dict:
+    try:
+        with open(
+            os.path.join(chromedrivers_base_path, RESOLUTION_CACHE_FILENAME),
+            encoding="utf-8",
+        ) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def lookup_chromedriver(chromedrivers_base_path: str, fingerprint: dict):
+    key = _fingerprint_key(fingerprint)
+
+    with _memo_lock:
+        entry = _memo.get((chromedrivers_base_path, key))
+
+    if entry is None:
+        # keyed by browser path, so a changed browser binary simply misses
+        manifest_entry = _load_manifest(chromedrivers_base_path).get(
+            fingerprint["path"]
+        )
+        if not manifest_entry or manifest_entry.get("fingerprint") != key:
+            return None
+        entry = {
+            "path": manifest_entry["chromedriver_path"],
+            "version": manifest_entry["chromedriver_version"],
+            "use_recorded_at": 0,
+        }
+
+    # the driver may have been evicted or deleted since it was cached
+    if not os.path.isfile(entry["path"]):
+        with _memo_lock:
+            _memo.pop((chromedrivers_base_path, key), None)
+        return None
+
+    now = time.time()
+    if (
+        now - entry["use_recorded_at"]
+        >= chromedriver_store.LAST_USED_RESOLUTION_SECONDS
+    ):
+        chromedriver_store.record_chromedriver_use(
+            chromedrivers_base_path, entry["version"]
+        )
+        entry["use_recorded_at"] = now
+
+    with _memo_lock:
+        _memo[(chromedrivers_base_path, key)] = entry
+
+    logger.debug(f"Using cached resolution {entry['path']} for {fingerprint['path']}")
+    return entry["path"]
+
+
+def remember_chromedriver(
+    chromedrivers_base_path: str, fingerprint: dict, chromedriver_path: str
+) -> None:
+    key = _fingerprint_key(fingerprint)
+    relative_path = os.path.relpath(chromedriver_path, chromedrivers_base_path)
+    version = relative_path.split(os.sep)[0]
+
+    with _memo_lock:
+        _memo[(chromedrivers_base_path, key)] = {
+            "path": chromedriver_path,
+            "version": version,
+            # the resolution that produced this path has just recorded the use
+            "use_recorded_at": time.time(),
+        }
+
+    manifest = _load_manifest(chromedrivers_base_path)
+    manifest[fingerprint["path"]] = {
+        "fingerprint": key,
+        "chromedriver_path": chromedriver_path,
+        "chromedriver_version": version,
+    }
+
+    manifest_path = os.path.join(chromedrivers_base_path, RESOLUTION_CACHE_FILENAME)
+    tmp_path = None
+    try:
+        # unique per writer, since threads of one process may remember at once
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=f"{RESOLUTION_CACHE_FILENAME}.",
+            suffix=".tmp",
+            dir=chromedrivers_base_path,
+        )
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, indent=1, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+    except OSError as exc:
+        logger.warning(f"Cannot write resolution cache {manifest_path}: {exc}")
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def clear_resolution_memo() -> None:
+    with _memo_lock:
+        _memo.clear()
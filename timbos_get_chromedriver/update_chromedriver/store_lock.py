@@ -0,0 +1,121 @@
+import contextlib
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+DRIVER_FIXING_LOCK_FILENAME = "driver_fixing.lock"
+LOCK_POLL_INTERVAL_SECONDS = 0.05
+
+lock_stats = {
+    "acquisitions": 0,
+    "contended": 0,
+    "wait_time_total": 0.0,
+    "wait_time_max": 0.0,
+}
+_lock_stats_lock = threading.Lock()
+
+# lock file path -> threading.Lock, so threads of one process queue up cheaply
+_thread_locks = {}
+_thread_locks_lock = threading.Lock()
+
+# lock file path -> nesting depth, for the lock paths the current thread holds
+_held = threading.local()
+
+
+def get_lock_stats() -> dict:
+    with _lock_stats_lock:
+        return dict(lock_stats)
+
+
+def _try_lock(fh) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fh) -> None:
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    else:
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def store_lock(
+    chromedrivers_base_path: str, timeout=None, name=DRIVER_FIXING_LOCK_FILENAME
+):
+    lock_path = os.path.join(chromedrivers_base_path, name)
+
+    # re-entered by a thread that already holds it, e.g. to update the store
+    # index while installing
+    depths = getattr(_held, "depths", None)
+    if depths is None:
+        depths = _held.depths = {}
+    if depths.get(lock_path):
+        depths[lock_path] += 1
+        try:
+            yield 0.0
+        finally:
+            depths[lock_path] -= 1
+        return
+
+    os.makedirs(chromedrivers_base_path, exist_ok=True)
+
+    with _thread_locks_lock:
+        thread_lock = _thread_locks.setdefault(lock_path, threading.Lock())
+
+    started_at = time.monotonic()
+    deadline = None if timeout is None else started_at + timeout
+
+    if not thread_lock.acquire(timeout=-1 if timeout is None else timeout):
+        raise TimeoutError(f"Timed out after {timeout}s waiting for {lock_path}")
+
+    fh = None
+    try:
+        fh = open(lock_path, "a+")
+        contended = False
+        while not _try_lock(fh):
+            contended = True
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Timed out after {timeout}s waiting for {lock_path}"
+                )
+            time.sleep(LOCK_POLL_INTERVAL_SECONDS)
+
+        waited = time.monotonic() - started_at
+        contended = contended or waited >= LOCK_POLL_INTERVAL_SECONDS
+        with _lock_stats_lock:
+            lock_stats["acquisitions"] += 1
+            lock_stats["contended"] += int(contended)
+            lock_stats["wait_time_total"] += waited
+            lock_stats["wait_time_max"] = max(lock_stats["wait_time_max"], waited)
+        if contended:
+            logger.info(f"Waited {waited:.2f}s for {lock_path}")
+
+        depths[lock_path] = 1
+        try:
+            yield waited
+        finally:
+            depths[lock_path] = 0
+            _unlock(fh)
+    finally:
+        if fh is not None:
+            fh.close()
+        thread_lock.release()
@@ -3,10 +3,10 @@ import os
 import re
 import subprocess
 import sys
-import tempfile
-import zipfile
 
-import requests
+from ..instrumentation import NULL_METRICS
+from . import chromedriver_store, known_good_versions, resolution_cache, store_lock
+from .downloads import download_binary_file
 
 logger = logging.getLogger(__name__)
 
@@ -57,13 +57,6 @@ def chrome_browser_available_on_path(platform=None) -> bool:
         return False
 
 
-def download_binary_file(url: str, path: str) -> None:
-    response = requests.get(url)
-    with open(path, "wb") as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
-
-
 def get_chrome_browser_version(platform=None) -> str:
     if platform not in ["linux", "windows"]:
         raise Exception(f"Unsupported platform: {platform}.")
@@ -115,30 +108,106 @@ def is_a_version_number(s: str) -> bool:
     return bool(re.match(r"^[\d.]+$", s))
 
 
-def match_chromedriver_to_chrome_browser(chromedrivers_base_path=None) -> None:
-    if not chromedrivers_base_path:
-        temp_dir = tempfile.mkdtemp()
-        chromedrivers_base_path = os.path.join(temp_dir, "bin", "chromedrivers")
+def _record_install_and_evict(
+    chromedrivers_base_path, version, max_bytes, max_versions
+) -> None:
+    chromedriver_store.record_chromedriver_install(chromedrivers_base_path, version)
+    chromedriver_store.evict_chromedrivers(
+        chromedrivers_base_path,
+        max_bytes=max_bytes,
+        max_versions=max_versions,
+        keep=(version,),
+    )
 
-    config_path_to_chromedriver = None
+
+def match_chromedriver_to_chrome_browser(
+    chromedrivers_base_path=None,
+    chromedrivers_max_bytes=None,
+    chromedrivers_max_versions=None,
+    known_good_versions_url=None,
+    known_good_versions_ttl=known_good_versions.DEFAULT_KNOWN_GOOD_VERSIONS_TTL_SECONDS,
+    metrics=None,
+) -> None:
+    if metrics is None:
+        metrics = NULL_METRICS
+
+    if not chromedrivers_base_path:
+        chromedrivers_base_path = (
+            chromedriver_store.get_default_chromedrivers_base_path()
+        )
+        # only the package-managed store is evicted without being asked; a
+        # caller's own directory may hold more than chromedrivers
+        if chromedrivers_max_bytes is None and chromedrivers_max_versions is None:
+            chromedrivers_max_versions = (
+                chromedriver_store.DEFAULT_MAX_CHROMEDRIVER_VERSIONS
+            )
 
     platform = get_platform()
 
+    with metrics.span("resolve_chromedriver", platform=platform) as span:
+        # skip the version subprocesses and store scan unless the browser binary changed
+        fingerprint = None
+        if chrome_browser_executable := platform_to["chrome_browser_executable"].get(
+            platform
+        ):
+            fingerprint = resolution_cache.get_chrome_browser_fingerprint(
+                chrome_browser_executable
+            )
+        if fingerprint is not None:
+            if cached_path := resolution_cache.lookup_chromedriver(
+                chromedrivers_base_path, fingerprint
+            ):
+                span.set_tag("cache", "resolution_hit")
+                return cached_path
+
+        config_path_to_chromedriver = _match_chromedriver_to_chrome_browser(
+            chromedrivers_base_path,
+            platform,
+            chromedrivers_max_bytes,
+            chromedrivers_max_versions,
+            known_good_versions_url,
+            known_good_versions_ttl,
+            metrics,
+            span,
+        )
+
+    if fingerprint is not None and config_path_to_chromedriver:
+        resolution_cache.remember_chromedriver(
+            chromedrivers_base_path, fingerprint, config_path_to_chromedriver
+        )
+
+    return config_path_to_chromedriver
+
+
+def _match_chromedriver_to_chrome_browser(
+    chromedrivers_base_path,
+    platform,
+    chromedrivers_max_bytes,
+    chromedrivers_max_versions,
+    known_good_versions_url,
+    known_good_versions_ttl,
+    metrics,
+    resolve_span,
+):
+    config_path_to_chromedriver = None
+
     # determine whether chrome browser is available on path, and what version
     system_chrome_browser = {}
-    if chrome_browser_available_on_path(platform=platform):
-        if ver := get_chrome_browser_version(platform=platform):
-            system_chrome_browser["version"] = ver
-            system_chrome_browser["major_version"] = int(ver.split(".")[0])
-
+    with metrics.span("detect_chrome_version", platform=platform):
+        if chrome_browser_available_on_path(platform=platform):
+            if ver := get_chrome_browser_version(platform=platform):
+                system_chrome_browser["version"] = ver
+                system_chrome_browser["major_version"] = int(ver.split(".")[0])
+
+            else:
+                raise Exception(
+                    f"Cannot determine version of the {platform_to['chrome_browser_executable'][platform]} on path."
+                )
         else:
             raise Exception(
-                f"Cannot determine version of the {platform_to['chrome_browser_executable'][platform]} on path."
+                f"Cannot find {platform_to['chrome_browser_executable'][platform]} on path."
             )
-    else:
-        raise Exception(
-            f"Cannot find {platform_to['chrome_browser_executable'][platform]} on path."
-        )
+    resolve_span.set_tag("chrome_major_version", system_chrome_browser["major_version"])
 
     logger.info(
         f"Found {platform_to['chrome_browser_executable'][platform]} {system_chrome_browser['version']} on path"
@@ -152,6 +221,107 @@ def match_chromedriver_to_chrome_browser(chromedrivers_base_path=None) -> None:
     except PermissionError as exc:
         raise Exception(f"Error: {repr(exc)}")
 
+    with metrics.span("scan_chromedriver_store"):
+        config_path_to_chromedriver = _find_local_chromedriver(
+            chromedrivers_base_path, platform, system_chrome_browser
+        )
+    if config_path_to_chromedriver:
+        resolve_span.set_tag("cache", "store_hit")
+        return config_path_to_chromedriver
+
+    # only one process downloads a chromedriver; the others wait here and reuse it
+    with store_lock.store_lock(chromedrivers_base_path) as waited:
+        metrics.observe("store_lock_wait_seconds", waited)
+
+        # another process may have installed a suitable chromedriver while we waited
+        if config_path_to_chromedriver := _find_local_chromedriver(
+            chromedrivers_base_path, platform, system_chrome_browser
+        ):
+            resolve_span.set_tag("cache", "store_hit_after_wait")
+            return config_path_to_chromedriver
+
+        # invariant now: system chrome browser doesn't match any local chromedriver
+        logger.info(
+            f"Did not find any local chromedrivers with appropriate version for system Chrome browser. Will check online..."
+        )
+
+        # case: check if there's a downloadable chromedriver of same major version as chrome browser major version
+        # if so, download that version of chromedriver
+
+        google_json_endpoint = (
+            known_good_versions_url or known_good_versions.get_known_good_versions_url()
+        )
+        try:
+            with metrics.span("fetch_known_good_versions"):
+                version_index = known_good_versions.get_version_index(
+                    chromedrivers_base_path,
+                    url=google_json_endpoint,
+                    ttl=known_good_versions_ttl,
+                )
+        except Exception as exc:
+            raise Exception(
+                f"Cannot resolve url {google_json_endpoint} to find a compatible version of {platform_to['chromedriver_executable'][platform]}: {exc}. Exiting."
+            )
+
+        google_platform = platform_to["google_platform_designation"][platform]
+
+        # first, try to find an exact match of versions; failing that, the closest
+        # version of the same major; failing that, the highest version of
+        # chromedriver that's less than or equal to the system chrome browser version
+        downloadable = (
+            version_index.exact(system_chrome_browser["version"], google_platform)
+            or version_index.same_major(
+                system_chrome_browser["version"], google_platform
+            )
+            or version_index.highest_at_most(
+                system_chrome_browser["version"], google_platform
+            )
+        )
+
+        local_chromedriver_chosen_version = {}
+        if downloadable:
+            local_chromedriver_chosen_version["version"], download_url = downloadable
+            resolve_span.set_tag("cache", "download")
+
+            # download this version of chromedriver, unpacking only the executable
+            with metrics.span(
+                "install_chromedriver",
+                version=local_chromedriver_chosen_version["version"],
+            ):
+                local_chromedriver_chosen_version["path"] = (
+                    chromedriver_store.install_chromedriver(
+                        download_url,
+                        chromedrivers_base_path,
+                        local_chromedriver_chosen_version["version"],
+                        platform_to["chromedriver_subdir_name"][platform],
+                        platform_to["chromedriver_executable"][platform],
+                        metrics=metrics,
+                    )
+                )
+            logger.info(
+                f"Downloaded {platform_to['chromedriver_executable'][platform]} {local_chromedriver_chosen_version['version']} from {download_url}"
+            )
+
+            config_path_to_chromedriver = local_chromedriver_chosen_version["path"]
+            logger.info(
+                f"Using downloaded {platform_to['chromedriver_executable'][platform]} {local_chromedriver_chosen_version['version']} at {local_chromedriver_chosen_version['path']}"
+            )
+            _record_install_and_evict(
+                chromedrivers_base_path,
+                local_chromedriver_chosen_version["version"],
+                chromedrivers_max_bytes,
+                chromedrivers_max_versions,
+            )
+            return config_path_to_chromedriver
+
+        # invariant now: we couldn't find any downloadable chromedriver matching the system chrome browser version
+
+        raise Exception(
+            f"Cannot find a {platform_to['chromedriver_executable'][platform]} version for chrome browser version {system_chrome_browser['major_version']} locally or in {google_json_endpoint}."
+        )
+
+
+def _find_local_chromedriver(chromedrivers_base_path, platform, system_chrome_browser):
     local_chromedrivers_major_version_to_version = None
     all_files_and_dirs = os.listdir(chromedrivers_base_path)
     subdirs = [
@@ -162,14 +332,15 @@ def match_chromedriver_to_chrome_browser(chromedrivers_base_path=None) -> None:
     # subdir names need to be version numbers, so remove any that aren't
     subdirs = list(filter(lambda x: is_a_version_number(x), subdirs))
 
-    # subdirs need to contain the correct subsubdir by platform
+    # subdirs need to contain the chromedriver executable in the correct subsubdir by platform
     subdirs = list(
         filter(
-            lambda x: os.path.isdir(
-                os.path.join(
+            lambda x: os.path.isfile(
+                chromedriver_store.get_chromedriver_path(
                     chromedrivers_base_path,
                     x,
                     platform_to["chromedriver_subdir_name"][platform],
+                    platform_to["chromedriver_executable"][platform],
                 )
             ),
             subdirs,
@@ -185,6 +356,7 @@ def match_chromedriver_to_chrome_browser(chromedrivers_base_path=None) -> None:
 
     # next, determine if we have a local chromedriver of a suitable version
     local_chromedriver_chosen_version = {}
+    config_path_to_chromedriver = None
 
     # case: check if browser full version matches a local chromedriver full version
     if system_chrome_browser["version"] in local_chromedriver_versions:
@@ -200,6 +372,9 @@ def match_chromedriver_to_chrome_browser(chromedrivers_base_path=None) -> None:
         logger.info(
             f"Using existing {platform_to['chromedriver_executable'][platform]} {local_chromedriver_chosen_version['version']} at {local_chromedriver_chosen_version['path']}"
         )
+        chromedriver_store.record_chromedriver_use(
+            chromedrivers_base_path, local_chromedriver_chosen_version["version"]
+        )
         return config_path_to_chromedriver
 
     # case: check if browser major version matches a local chromedriver major version
@@ -230,149 +405,9 @@ def match_chromedriver_to_chrome_browser(chromedrivers_base_path=None) -> None:
         logger.info(
             f"Using existing {platform_to['chromedriver_executable'][platform]} {local_chromedriver_chosen_version['version']} at {local_chromedriver_chosen_version['path']}"
         )
-        return config_path_to_chromedriver
-
-    # invariant now: system chrome browser doesn't match any local chromedriver
-    logger.info(
-        f"Did not find any local chromedrivers with appropriate version for system Chrome browser. Will check online..."
-    )
-
-    # case: check if there's a downloadable chromedriver of same major version as chrome browser major version
-    # if so, download that version of chromedriver
-
-    google_json_endpoint = "https://googlechromelabs.github.io/chrome-for-testing/known-good-versions-with-downloads.json"
-    try:
-        response = requests.get(google_json_endpoint)
-    except Exception as exc:
-        raise Exception(
-            f"Cannot resolve url {google_json_endpoint} to find a compatible version of {platform_to['chromedriver_executable'][platform]}: {exc}. Exiting."
-        )
-
-    if response.status_code != 200:
-        raise Exception(
-            f"Cannot resolve url {google_json_endpoint} to find a compatible version of {platform_to['chromedriver_executable'][platform]}: {exc}. Exiting."
+        chromedriver_store.record_chromedriver_use(
+            chromedrivers_base_path, local_chromedriver_chosen_version["version"]
         )
+        return config_path_to_chromedriver
 
-    json = response.json()
-
-    # first, try to find an exact match of versions
-    for each_version in json["versions"]:
-        if (
-            "version" in each_version
-            and each_version["version"] == system_chrome_browser["version"]
-            and "downloads" in each_version
-            and "chromedriver" in each_version["downloads"]
-        ):
-            for each_chromedriver in each_version["downloads"]["chromedriver"]:
-                if (
-                    each_chromedriver["platform"]
-                    == platform_to["google_platform_designation"][platform]
-                ):
-                    download_url = each_chromedriver["url"]
-
-                    # download this version of chromedriver
-                    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
-                        download_binary_file(
-                            download_url, os.path.join(tmp, "chromedriver.zip")
-                        )
-                        with zipfile.ZipFile(
-                            os.path.join(tmp, "chromedriver.zip"), "r"
-                        ) as z:
-                            z.extractall(
-                                os.path.join(
-                                    chromedrivers_base_path,
-                                    each_version["version"],
-                                )
-                            )
-
-                    local_chromedriver_chosen_version["version"] = each_version[
-                        "version"
-                    ]
-
-                    local_chromedriver_chosen_version["path"] = os.path.join(
-                        chromedrivers_base_path,
-                        local_chromedriver_chosen_version["version"],
-                        platform_to["chromedriver_subdir_name"][platform],
-                        platform_to["chromedriver_executable"][platform],
-                    )
-                    # on linux, ensure that the new chromedriver is executable
-                    if platform == "linux":
-                        os.chmod(
-                            local_chromedriver_chosen_version["path"],
-                            os.stat(local_chromedriver_chosen_version["path"]).st_mode
-                            | 0o111,
-                        )
-                        config_path_to_chromedriver = local_chromedriver_chosen_version[
-                            "path"
-                        ]
-
-                    logger.info(
-                        f"Downloaded {platform_to['chromedriver_executable'][platform]} {local_chromedriver_chosen_version['version']} to {local_chromedriver_chosen_version['path']}"
-                    )
-
-                    logger.info(
-                        f"Found {platform_to['chromedriver_executable'][platform]} {local_chromedriver_chosen_version['version']} at {local_chromedriver_chosen_version['path']}"
-                    )
-                    return config_path_to_chromedriver
-
-    # invariant now: we didn't find an exact match of versions online
-
-    # so, try to find the highest version of chromedriver that's less than or equal to the system chrome browser version
-    json_versions = list(json["versions"])
-    for i, each_version in enumerate(json_versions):
-        if each_version["version"] > system_chrome_browser["version"]:
-            desired_version = json_versions[i - 1]
-            local_chromedriver_chosen_version["version"] = desired_version["version"]
-            for each_chromedriver in desired_version["downloads"]["chromedriver"]:
-                if (
-                    each_chromedriver["platform"]
-                    == platform_to["google_platform_designation"][platform]
-                ):
-                    download_url = each_chromedriver["url"]
-
-                    # download this version of chromedriver
-                    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
-                        download_binary_file(
-                            download_url,
-                            os.path.join(tmp, "chromedriver.zip"),
-                        )
-                        with zipfile.ZipFile(
-                            os.path.join(tmp, "chromedriver.zip"), "r"
-                        ) as z:
-                            z.extractall(
-                                os.path.join(
-                                    chromedrivers_base_path,
-                                    local_chromedriver_chosen_version["version"],
-                                )
-                            )
-                        logger.info(
-                            f"Downloaded {platform_to['chromedriver_executable'][platform]} {local_chromedriver_chosen_version['version']} from {each_chromedriver['url']}"
-                        )
-
-                    local_chromedriver_chosen_version["path"] = os.path.join(
-                        chromedrivers_base_path,
-                        local_chromedriver_chosen_version["version"],
-                        platform_to["chromedriver_subdir_name"][platform],
-                        platform_to["chromedriver_executable"][platform],
-                    )
-                    # on linux, ensure that the new chromedriver is executable
-                    if platform == "linux":
-                        os.chmod(
-                            local_chromedriver_chosen_version["path"],
-                            os.stat(local_chromedriver_chosen_version["path"]).st_mode
-                            | 0o111,
-                        )
-
-                    config_path_to_chromedriver = local_chromedriver_chosen_version[
-                        "path"
-                    ]
-                    logger.info(
-                        f"Using downloaded {platform_to['chromedriver_executable'][platform]} {local_chromedriver_chosen_version['version']} at {local_chromedriver_chosen_version['path']}"
-                    )
-                    return config_path_to_chromedriver
-
-    # invariant now: we couldn't find any downloadable chromedriver matching the system chrome browser version
-
-    raise Exception(
-        f"Cannot find a {platform_to['chromedriver_executable'][platform]} version for chrome browser version {system_chrome_browser['major_version']} locally or in {google_json_endpoint}."
-    )
+    return None
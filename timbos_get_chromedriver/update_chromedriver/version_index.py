@@ -0,0 +1,112 @@
+import bisect
+
+VERSION_INDEX_FORMAT = 1
+
+
+def parse_version(version: str) -> tuple:
+    return tuple(int(part) for part in version.split("."))
+
+
+class VersionIndex:
+    """Chromedriver downloads from the known-good-versions manifest, sorted by
+    parsed version and split per platform so lookups can bisect."""
+
+    def __init__(self, entries):
+        # entries: iterable of (version string, {google platform: chromedriver url})
+        self._versions = sorted(
+            (
+                (parse_version(version), version, downloads)
+                for version, downloads in entries
+            ),
+            key=lambda entry: entry[0],
+        )
+        self._downloads_by_version = {
+            version: downloads for _, version, downloads in self._versions
+        }
+        self._by_platform = {}
+        for key, version, downloads in self._versions:
+            for google_platform, url in downloads.items():
+                keys, versions, urls = self._by_platform.setdefault(
+                    google_platform, ([], [], [])
+                )
+                keys.append(key)
+                versions.append(version)
+                urls.append(url)
+
+    def __len__(self):
+        return len(self._versions)
+
+    @classmethod
+    def from_known_good_versions(cls, known_good_versions: dict, resolve_url=None):
+        # resolve_url turns a mirror's relative download urls into absolute ones
+        entries = []
+        for each_version in known_good_versions.get("versions", []):
+            version = each_version.get("version")
+            chromedrivers = each_version.get("downloads", {}).get("chromedriver")
+            if not version or not chromedrivers:
+                continue
+            try:
+                parse_version(version)
+            except ValueError:
+                continue
+            urls = {c["platform"]: c["url"] for c in chromedrivers}
+            if resolve_url:
+                urls = {p: resolve_url(url) for p, url in urls.items()}
+            entries.append((version, urls))
+        return cls(entries)
+
+    @classmethod
+    def from_dict(cls, d: dict):
+        if d.get("format") != VERSION_INDEX_FORMAT:
+            raise ValueError(f"Unsupported version index format {d.get('format')}")
+        return cls((version, downloads) for version, downloads in d["versions"])
+
+    def to_dict(self) -> dict:
+        return {
+            "format": VERSION_INDEX_FORMAT,
+            "versions": [
+                [version, downloads] for _, version, downloads in self._versions
+            ],
+        }
+
+    def platforms(self) -> list:
+        return sorted(self._by_platform)
+
+    def versions(self, google_platform=None) -> list:
+        if google_platform is None:
+            return [version for _, version, _ in self._versions]
+        return list(self._by_platform.get(google_platform, ([], [], []))[1])
+
+    def platforms_for(self, version: str) -> list:
+        return sorted(self._downloads_by_version.get(version, {}))
+
+    # each lookup returns (version string, download url) or None
+
+    def exact(self, version: str, google_platform: str):
+        keys, versions, urls = self._by_platform.get(google_platform, ([], [], []))
+        key = parse_version(version)
+        i = bisect.bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return versions[i], urls[i]
+        return None
+
+    def highest_at_most(self, version: str, google_platform: str):
+        keys, versions, urls = self._by_platform.get(google_platform, ([], [], []))
+        i = bisect.bisect_right(keys, parse_version(version))
+        if i == 0:
+            return None
+        return versions[i - 1], urls[i - 1]
+
+    def same_major(self, version: str, google_platform: str):
+        # the highest version of the same major that is <= version, else the
+        # lowest version of that major above it
+        keys, versions, urls = self._by_platform.get(google_platform, ([], [], []))
+        key = parse_version(version)
+        major = key[0]
+
+        i = bisect.bisect_right(keys, key)
+        if i > 0 and keys[i - 1][0] == major:
+            return versions[i - 1], urls[i - 1]
+        if i < len(keys) and keys[i][0] == major:
+            return versions[i], urls[i]
+        return None
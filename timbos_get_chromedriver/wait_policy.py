@@ -0,0 +1,141 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+PAGE_LOAD_STRATEGIES = ("normal", "eager", "none")
+
+DEFAULT_NETWORK_IDLE_SECONDS = 0.5
+DEFAULT_NETWORK_IDLE_TIMEOUT = 30
+DEFAULT_NETWORK_IDLE_MAX_INFLIGHT = 0
+# a request with no response after this long is assumed to have failed upstream
+DEFAULT_STALE_REQUEST_SECONDS = 10
+POLL_INTERVAL_SECONDS = 0.1
+
+# the number of resource timing entries and whether the document has loaded;
+# entries are only added when a resource finishes, so in-flight requests are
+# invisible to this fallback
+RESOURCE_PROGRESS_SCRIPT = """
+return [performance.getEntriesByType("resource").length, document.readyState];
+"""
+
+
+class WaitPolicy:
+    """How long a driver waits, and for what.
+
+    page_load_strategy: "normal" waits for the load event in driver.get(),
+    "eager" for DOMContentLoaded, "none" returns once navigation has started
+    page_load_timeout: seconds before driver.get() gives up
+    implicit_wait: seconds find_element(s) keeps retrying when nothing matches
+    script_timeout: seconds an async script may run, or None for selenium's
+    default
+    network_idle: after each driver.get(), also wait until the network has
+    been quiet for `network_idle_seconds`
+    """
+
+    def __init__(
+        self,
+        *,
+        page_load_strategy="normal",
+        page_load_timeout=60,
+        implicit_wait=0,
+        script_timeout=None,
+        network_idle=False,
+        network_idle_seconds=DEFAULT_NETWORK_IDLE_SECONDS,
+        network_idle_timeout=DEFAULT_NETWORK_IDLE_TIMEOUT,
+        network_idle_max_inflight=DEFAULT_NETWORK_IDLE_MAX_INFLIGHT,
+    ):
+        if page_load_strategy not in PAGE_LOAD_STRATEGIES:
+            raise Exception(
+                f"Unknown page load strategy {page_load_strategy!r}; "
+                f"choose from {PAGE_LOAD_STRATEGIES}."
+            )
+        self.page_load_strategy = page_load_strategy
+        self.page_load_timeout = page_load_timeout
+        self.implicit_wait = implicit_wait
+        self.script_timeout = script_timeout
+        self.network_idle = network_idle
+        self.network_idle_seconds = network_idle_seconds
+        self.network_idle_timeout = network_idle_timeout
+        self.network_idle_max_inflight = network_idle_max_inflight
+
+    @classmethod
+    def legacy(cls):
+        """The fixed 180 s page-load and element waits get_chromedriver() has
+        always used."""
+        return cls(page_load_timeout=180, implicit_wait=180)
+
+    def apply(self, driver) -> None:
+        driver.set_page_load_timeout(self.page_load_timeout)
+        driver.implicitly_wait(self.implicit_wait)
+        if self.script_timeout is not None:
+            driver.set_script_timeout(self.script_timeout)
+
+        if self.network_idle:
+            get = driver.get
+
+            def get_and_wait_for_network_idle(url):
+                result = get(url)
+                wait_for_network_idle(
+                    driver,
+                    idle_seconds=self.network_idle_seconds,
+                    timeout=self.network_idle_timeout,
+                    max_inflight=self.network_idle_max_inflight,
+                )
+                return result
+
+            driver.get = get_and_wait_for_network_idle
+
+
+def _wait_for_capture_idle(capture, idle_seconds, timeout, max_inflight) -> bool:
+    deadline = time.monotonic() + timeout
+    while True:
+        inflight, last_activity = capture.activity(
+            stale_after=DEFAULT_STALE_REQUEST_SECONDS
+        )
+        now = time.monotonic()
+        if inflight <= max_inflight and now - last_activity >= idle_seconds:
+            return True
+        if now >= deadline:
+            return False
+        time.sleep(POLL_INTERVAL_SECONDS)
+
+
+def _wait_for_resource_timing_idle(driver, idle_seconds, timeout) -> bool:
+    deadline = time.monotonic() + timeout
+    last_count = None
+    quiet_since = time.monotonic()
+    while True:
+        count, ready_state = driver.execute_script(RESOURCE_PROGRESS_SCRIPT)
+        now = time.monotonic()
+        if count != last_count or ready_state != "complete":
+            last_count = count
+            quiet_since = now
+        elif now - quiet_since >= idle_seconds:
+            return True
+        if now >= deadline:
+            return False
+        time.sleep(POLL_INTERVAL_SECONDS)
+
+
+def wait_for_network_idle(
+    driver,
+    idle_seconds=DEFAULT_NETWORK_IDLE_SECONDS,
+    timeout=DEFAULT_NETWORK_IDLE_TIMEOUT,
+    max_inflight=DEFAULT_NETWORK_IDLE_MAX_INFLIGHT,
+) -> bool:
+    """Wait until at most `max_inflight` requests are outstanding and nothing
+    has started or finished for `idle_seconds`. Returns False on timeout.
+
+    Drivers with a request capture index (see CapturePolicy) are tracked from
+    the proxy's own request and response events; others fall back to polling
+    the page's resource timing entries.
+    """
+    if capture := getattr(driver, "capture", None):
+        idle = _wait_for_capture_idle(capture, idle_seconds, timeout, max_inflight)
+    else:
+        idle = _wait_for_resource_timing_idle(driver, idle_seconds, timeout)
+    if not idle:
+        logger.debug(f"Network not idle after {timeout}s")
+    return idle